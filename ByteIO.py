@@ -1,14 +1,29 @@
 import contextlib
 import io
+import mmap
 import struct
 import typing
 from io import BytesIO
 from typing import List
 
+import numpy as np
+
 
 class OffsetOutOfBounds(Exception):
     pass
 
+
+_structs = {}
+
+
+def get_struct(fmt):
+    """Compiled struct.Struct for `fmt`, cached per format string."""
+    compiled = _structs.get(fmt)
+    if compiled is None:
+        compiled = _structs[fmt] = struct.Struct(fmt)
+    return compiled
+
+
 def split(array, n=3):
     return [array[i:i + n] for i in range(0, len(array), n)]
 
@@ -19,17 +34,22 @@ class ByteIO:
         yield
         self.seek(entry)
 
-    def __init__(self, file=None, path=None, byte_object=None, mode='r', copy_data_from_handle=True):
+    def __init__(self, file=None, path=None, byte_object=None, mode='r', copy_data_from_handle=True,
+                 use_mmap=False):
 
         """
         Supported file handlers
         :type byte_object: bytes
         :type path: str,Path
         :type file: typing.BinaryIO
+        :param use_mmap: memory-map files opened for reading instead of copying them into memory
         """
         if file:
             if 'w' in file.mode:
                 self.file = file
+            elif 'r' in file.mode and use_mmap:
+                self.file = self._map(file)
+                file.close()
             elif 'r' in file.mode and copy_data_from_handle:
                 self.file = io.BytesIO(file.read())
                 file.close()
@@ -40,13 +60,24 @@ class ByteIO:
                 self.file = open(path, mode + 'b')
             elif 'r' in mode:
                 with open(path, mode + 'b') as f:
-                    self.file = io.BytesIO(f.read())
+                    self.file = self._map(f) if use_mmap else io.BytesIO(f.read())
 
         elif byte_object:
             self.file = io.BytesIO(byte_object)
         else:
             self.file = BytesIO()
 
+    @staticmethod
+    def _map(file):
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files can not be mapped
+            return BytesIO()
+
+    @property
+    def mapped(self):
+        return isinstance(self.file, mmap.mmap)
+
     def __repr__(self):
         return "<ByteIO {}/{}>".format(self.tell(), self.size())
 
@@ -103,6 +134,16 @@ class ByteIO:
         for _ in range(amount):
             self._write(b'\x00')
 
+    def get_buffer(self):
+        """Read-only view of the whole underlying data, without copying when possible."""
+        if isinstance(self.file, BytesIO):
+            return self.file.getbuffer().toreadonly()
+        if self.mapped:
+            return memoryview(self.file).toreadonly()
+        with self.save_current_pos():
+            self.seek(0)
+            return memoryview(self._read()).toreadonly()
+
     def insert_begin(self, to_insert):
         self.seek(0)
         buffer = self._read(-1)
@@ -120,12 +161,16 @@ class ByteIO:
             return self._read(size)
 
     def peek(self, t):
-        size = struct.calcsize(t)
-        return struct.unpack(t, self._peek(size))[0]
+        compiled = get_struct(t)
+        return compiled.unpack(self._peek(compiled.size))[0]
 
     def peek_fmt(self, fmt):
-        size = struct.calcsize(fmt)
-        return struct.unpack(fmt, self._peek(size))
+        compiled = get_struct(fmt)
+        return compiled.unpack(self._peek(compiled.size))
+
+    def peek_array(self, dtype, count):
+        with self.save_current_pos():
+            return self.read_array(dtype, count)
 
     def peek_uint64(self):
         return self.peek('Q')
@@ -167,12 +212,25 @@ class ByteIO:
         return self.file.read(size)
 
     def read(self, t):
-        size = struct.calcsize(t)
-        return struct.unpack(t, self._read(size))[0]
+        compiled = get_struct(t)
+        return compiled.unpack(self._read(compiled.size))[0]
 
     def read_fmt(self, fmt):
-        size = struct.calcsize(fmt)
-        return struct.unpack(fmt, self._read(size))
+        compiled = get_struct(fmt)
+        return compiled.unpack(self._read(compiled.size))
+
+    def read_array(self, dtype, count):
+        """Read `count` items of `dtype` as a NumPy array; a zero-copy view when memory-mapped."""
+        dtype = np.dtype(dtype)
+        size = dtype.itemsize * count
+        offset = self.tell()
+        if offset + size > self.size():
+            raise OffsetOutOfBounds()
+        if self.mapped:
+            ret = np.frombuffer(self.get_buffer(), dtype, count, offset)
+            self.skip(size)
+            return ret
+        return np.frombuffer(self._read(size), dtype, count)
 
     def read_uint64(self):
         return self.read('Q')
@@ -209,14 +267,20 @@ class ByteIO:
 
     def read_ascii_string(self, length=None):
         if length:
-            return bytes(''.join([chr(self.read_uint8()) for _ in range(length)]), 'utf').strip(b'\x00').decode('utf')
-
-        acc = ''
-        b = self.read_uint8()
-        while b != 0:
-            acc += chr(b)
-            b = self.read_uint8()
-        return acc
+            return self._read(length).strip(b'\x00').decode('latin-1')
+
+        acc = bytearray()
+        while True:
+            chunk = self._read(64)
+            if not chunk:
+                break
+            end = chunk.find(b'\x00')
+            if end != -1:
+                acc += chunk[:end]
+                self.rewind(len(chunk) - end - 1)
+                break
+            acc += chunk
+        return acc.decode('latin-1')
 
     def read_fourcc(self):
         return self.read_ascii_string(4)
@@ -237,7 +301,10 @@ class ByteIO:
         self.file.write(data)
 
     def write(self, t, value):
-        self._write(struct.pack(t, value))
+        self._write(get_struct(t).pack(value))
+
+    def write_array(self, array, dtype=None):
+        self._write(np.ascontiguousarray(array, dtype=dtype).tobytes())
 
     def write_uint64(self, value):
         self.write('Q', value)
@@ -1,52 +1,612 @@
+import contextlib
 import math
-from typing import List
+import sys
+import threading
+import time
+import warnings
+from collections.abc import Mapping
 
 import numpy as np
 from pathlib import Path
 
 try:
-    from .ByteIO import ByteIO, split
+    from .ByteIO import ByteIO, OffsetOutOfBounds
 except ImportError:
-    from ByteIO import ByteIO, split
+    from ByteIO import ByteIO, OffsetOutOfBounds
 bone_names = {}
 armature_name = ''
+# bump whenever decoding changes the produced arrays, cached results are keyed by it
+PARSER_VERSION = 3
+
+
+def decode_indices(raw):
+    if raw.dtype == np.float32:
+        return np.rint(raw).astype(np.uint32).reshape((-1, 3))
+    return raw.astype(np.uint16).reshape((-1, 3))
+
+
+def decode_normals(raw, signs, depth):
+    xy = raw.reshape((-1, 2)) * np.float32(2 / depth) - 1
+    normals = np.empty((len(xy), 3), dtype=np.float32)
+    normals[:, :2] = xy
+    normals[:, 2] = np.where(signs, np.float32(1), np.float32(-1)) * (1 - xy[:, 0] ** 2 - xy[:, 1] ** 2)
+    return normals
+
+
+def decode_vertex_colors(layers):
+    vertex_colors = {}
+    for layer_name, raw in layers.items():
+        v_colors = np.ones((len(raw), 4), dtype=np.float32)
+        v_colors[:, :3] = (raw / np.float32(255))[:, None]
+        vertex_colors[layer_name] = v_colors
+    return vertex_colors
+
+
+def split_influences(block, dtype, depth=None):
+    """Split a (N, weight_per_vert) block into (N,4) primary and (N, weight_per_vert - 4) additional arrays."""
+    if depth is not None:
+        block = block / np.float32(depth)
+    primary = np.zeros((len(block), 4), dtype=dtype)
+    primary[:, :block.shape[1]] = block[:, :4]
+    return primary, block[:, 4:].astype(dtype)
+
+
+def single_parent_influences(vertex_count, bone):
+    skin_indices = np.zeros((vertex_count, 4), dtype=np.int16)
+    skin_weights = np.zeros((vertex_count, 4), dtype=np.float32)
+    skin_indices[:, 0] = bone
+    skin_weights[:, 0] = 1
+    return skin_indices, skin_weights
+
+
+def settings_layout(version):
+    """Names of the settings bits stored by format `version`, and the count of padding bits after them."""
+    attributes = ["mesh", "normals", "uv1", "uv2", "blendTargets", "blendNormals", "weights", "animations",
+                  "jointScales", "addon", "paintMapping", "singleParent", "frameMappings", "indices32bit",
+                  "originalIndices", "vertexColors"]
+    if version < 1.2:
+        return attributes, 0
+    attributes.append('posGroups')
+    padding = 32
+    if version >= 1.25:
+        attributes.append('uvSeams')
+        attributes.append('rivets')
+        padding -= 2
+    return attributes, padding
+
+
+def dequantize(raw, low, high, depth):
+    """Map quantized integers from [0, depth] back onto [low, high] as float32."""
+    low = np.asarray(low, dtype=np.float32)
+    step = (np.asarray(high, dtype=np.float32) - low) / np.float32(depth)
+    return raw.astype(np.float32) * step + low
+
+
+def weld_map(columns, tolerance):
+    """Vertices to keep and the old -> new vertex remap for rows of `columns` that agree within `tolerance`.
+
+    `columns` are (N, ...) per-vertex arrays. Float columns are snapped to a grid of `tolerance`,
+    integer columns must match exactly. Kept vertices stay in their original order.
+    """
+    keys = []
+    for column in columns:
+        column = np.asarray(column).reshape((len(column), -1))
+        if column.dtype.kind == 'f':
+            column = np.rint(column / tolerance)
+        keys.append(column.astype(np.int64))
+    keys = np.ascontiguousarray(np.concatenate(keys, axis=1))
+    rows = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()]
+
+
+class ShapeKeyData(Mapping):
+    """Shape key name -> (N,3) float32 offsets, decoded on first access."""
+
+    def __init__(self):
+        self._sources = {}
+        self._decoded = {}
+
+    def add(self, name, raw, low, high):
+        self._sources[name] = (raw, low, high)
+        self._decoded.pop(name, None)
+
+    def __getitem__(self, name):
+        if name not in self._decoded:
+            self._decoded[name] = self.decode(name)
+        return self._decoded[name]
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def __repr__(self):
+        return "<ShapeKeyData {} keys, {} decoded>".format(len(self._sources), len(self._decoded))
+
+    def decode(self, name):
+        """Offsets of `name` without keeping them, for one-pass consumers such as streaming exporters."""
+        if name in self._decoded:
+            return self._decoded[name]
+        raw, low, high = self._sources[name]
+        return dequantize(raw, low, high, HeroFile.me)
+
+    def add_decoded(self, name, offsets):
+        self._sources[name] = None
+        self._decoded[name] = offsets
+
+    def is_decoded(self, name):
+        return name in self._decoded
+
+    def take(self, vertices):
+        """Copy holding only `vertices` of every key; undecoded keys stay undecoded."""
+        ret = ShapeKeyData()
+        for name, source in self._sources.items():
+            if source is None:
+                ret.add_decoded(name, self._decoded[name][vertices])
+            else:
+                raw, low, high = source
+                ret.add(name, raw[vertices], low, high)
+        return ret
+
+    def bounds(self, name):
+        if self._sources[name] is None:
+            return self._decoded[name].min(axis=0), self._decoded[name].max(axis=0)
+        _, low, high = self._sources[name]
+        return low, high
+
+
+def output_nbytes(value, _seen=None):
+    """Bytes of decoded arrays reachable from `value`.
+
+    Views into the file buffer or a memory map and undecoded shape keys are free, lazy attributes
+    are not decoded, and an array reachable several times is counted once per `_seen` set.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        root = value
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        if root.base is not None or (root is not value and id(root) in _seen):
+            return 0
+        _seen.add(id(root))
+        return root.nbytes
+    if isinstance(value, ShapeKeyData):
+        return sum(output_nbytes(offsets, _seen) for offsets in value._decoded.values())
+    if isinstance(value, HeroFile):
+        return value.reader.size() + output_nbytes(value.geometry, _seen)
+    if isinstance(value, HeroBone):
+        return output_nbytes(value.skeleton, _seen)
+    if isinstance(value, dict):
+        return sum(output_nbytes(item, _seen) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(output_nbytes(item, _seen) for item in value)
+    if hasattr(value, '__dict__'):
+        return output_nbytes(vars(value), _seen)
+    return 0
+
+
+class ReadStats:
+    """Per-stage timing and byte accounting for HeroFile.read(stats=...).
+
+    `stages` maps each stage name to its seconds, the words consumed from the (i32, i16, i8, i1)
+    sections, the bytes of decoded output and the exception it raised, if any. `leftover` holds the
+    words the stages left unread in each section, which is non-zero when the format drifted from
+    what the parser expects.
+    """
+    SECTIONS = ('i32', 'i16', 'i8', 'i1')
+
+    def __init__(self):
+        self.stages = {}
+        self.leftover = None
+
+    def __repr__(self):
+        return "<ReadStats {} stages {:.3f} ms{}>".format(
+            len(self.stages), self.seconds * 1000, '' if self.aligned else ' leftover {}'.format(self.leftover))
+
+    def stage(self, name, seconds, words, nbytes, error=None):
+        self.stages[name] = {'seconds': seconds, 'words': dict(zip(self.SECTIONS, words)), 'nbytes': nbytes,
+                             'error': error}
+
+    def finish(self, leftover):
+        self.leftover = dict(zip(self.SECTIONS, leftover))
+
+    @property
+    def seconds(self):
+        return sum(stage['seconds'] for stage in self.stages.values())
+
+    @property
+    def aligned(self):
+        """True once every section was consumed exactly up to its boundary."""
+        return self.leftover is not None and not any(self.leftover.values())
+
+    @property
+    def errors(self):
+        return {name: stage['error'] for name, stage in self.stages.items() if stage['error'] is not None}
 
 
 class HeroGeomerty:
+    ARRAY_ATTRIBUTES = ('index', 'original_indices', 'positions', 'normals', 'uv', 'uv2', 'skin_indices',
+                        'additional_skin_indices', 'skin_weights', 'additional_skin_weights')
+    FLAG_ATTRIBUTES = ('main_skeleton', 'has_geometry', 'skinned')
+
     def __init__(self):
-        self.index = []
-        self.positions = []
-        self.normals = []
-        self.uv = []
-        self.uv2 = []
+        self.index = np.zeros((0, 3), dtype=np.uint16)  # type:np.ndarray
+        self.positions = np.zeros((0, 3), dtype=np.float32)  # type:np.ndarray
+        self.normals = np.zeros((0, 3), dtype=np.float32)  # type:np.ndarray
+        self.uv = np.zeros((0, 2), dtype=np.float32)  # type:np.ndarray
+        self.uv2 = np.zeros((0, 2), dtype=np.float32)  # type:np.ndarray
         self.vertex_colors = {}
-        self.shape_key_data = {}
+        self.shape_key_data = ShapeKeyData()
         self.skin_indices = np.array([])  # type:np.ndarray
         self.additional_skin_indices = np.array([])  # type:np.ndarray
         self.skin_weights = np.array([])  # type:np.ndarray
         self.additional_skin_weights = np.array([])  # type:np.ndarray
-        self.original_indices = []
+        # per corner vertex ids of the authoring mesh, parallel to `index`; never remapped
+        self.original_indices = np.zeros((0, 3), dtype=np.uint16)  # type:np.ndarray
         self.main_skeleton = False
         self.has_geometry = False
         self.skinned = False
         self.bounds = []
         self.scale = []
         self.offset = []
-        self.bones = []  # type: List[HeroBone]
-        self.poses = []
-        self.locations = []
+        self.bones = Skeleton()  # type: Skeleton
+        self.poses = {}
+        self.locations = {}
+        self._defaults = {}
+        self._pending = {}
+        self._resolve = None
+        self._lock = threading.RLock()  # serializes first access of lazy attributes
+        self._observers = []
+
+    def to_arrays(self):
+        """Flatten the decoded geometry into a dict of NumPy arrays with path-like keys."""
+        arrays = {name: np.asarray(getattr(self, name)) for name in self.ARRAY_ATTRIBUTES}
+        for name in self.FLAG_ATTRIBUTES:
+            arrays['flags/' + name] = np.asarray(bool(getattr(self, name)))
+        arrays['bounds'] = np.asarray(self.bounds, dtype=np.float32).reshape((-1, 3))
+        for layer_name, colors in self.vertex_colors.items():
+            arrays['vertex_colors/' + layer_name] = colors
+        for shape_key_name, offsets in self.shape_key_data.items():
+            arrays['shape_keys/' + shape_key_name] = offsets
+        if self.bones:
+            arrays.update(self._skeleton_arrays('bones', self.bones))
+        if self.locations:
+            locators = list(self.locations.values())
+            arrays.update(self._skeleton_arrays('locators', Skeleton(
+                [locator.name for locator in locators], None, [locator.pos for locator in locators],
+                [locator.quat for locator in locators], [locator.scale for locator in locators])))
+        for clip_name, tracks in self.poses.items():
+            for bone_name, track in tracks.items():
+                for channel in ('pos', 'rot', 'scl'):
+                    arrays['poses/{}/{}/{}'.format(clip_name, bone_name, channel)] = np.asarray(track[channel],
+                                                                                              dtype=np.float32)
+                if track['frameMapping'] is not None:
+                    mapping = track['frameMapping']
+                    arrays['poses/{}/frame_mapping'.format(clip_name)] = np.array(sorted(mapping, key=mapping.get),
+                                                                                  dtype=np.uint16)
+        return arrays
+
+    @staticmethod
+    def _skeleton_arrays(prefix, skeleton):
+        return {prefix + '/name': np.array(skeleton.names), prefix + '/parent_id': skeleton.parent_ids,
+                prefix + '/pos': skeleton.positions, prefix + '/quat': skeleton.quaternions,
+                prefix + '/scale': skeleton.scales}
+
+    @staticmethod
+    def _skeleton_from_arrays(prefix, arrays):
+        return Skeleton(arrays[prefix + '/name'], arrays[prefix + '/parent_id'], arrays[prefix + '/pos'],
+                        arrays[prefix + '/quat'], arrays[prefix + '/scale'])
+
+    @property
+    def skeleton(self):
+        return self.bones
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a geometry from `to_arrays` output. Arrays are used as-is, so memory-mapped ones stay mapped."""
+        geometry = cls()
+        for name in cls.ARRAY_ATTRIBUTES:
+            if name in arrays:
+                setattr(geometry, name, arrays[name])
+        for name in cls.FLAG_ATTRIBUTES:
+            setattr(geometry, name, bool(arrays['flags/' + name]))
+        geometry.bounds = arrays['bounds'].tolist()
+        if 'bones/name' in arrays:
+            geometry.bones = cls._skeleton_from_arrays('bones', arrays)
+        if 'locators/name' in arrays:
+            geometry.locations = {locator.name: locator for locator in cls._skeleton_from_arrays('locators', arrays)}
+        frame_mappings = {}
+        for key, value in arrays.items():
+            group, _, rest = key.partition('/')
+            if group == 'vertex_colors':
+                geometry.vertex_colors[rest] = value
+            elif group == 'shape_keys':
+                geometry.shape_key_data.add_decoded(rest, value)
+            elif group == 'poses':
+                clip_name, rest = rest.split('/', 1)
+                tracks = geometry.poses.setdefault(clip_name, {})
+                if rest == 'frame_mapping':
+                    frame_mappings[clip_name] = {int(frame): n for n, frame in enumerate(value)}
+                    continue
+                bone_name, channel = rest.rsplit('/', 1)
+                tracks.setdefault(bone_name, {'frameMapping': None})[channel] = value
+        for clip_name, mapping in frame_mappings.items():
+            for track in geometry.poses[clip_name].values():
+                track['frameMapping'] = mapping
+        return geometry
+
+    def copy(self):
+        """Shallow copy with every lazy attribute resolved; arrays are shared, not duplicated."""
+        clone = HeroGeomerty()
+        for name in list(vars(clone)):
+            if not name.startswith('_'):
+                setattr(clone, name, getattr(self, name))
+        return clone
+
+    def weld(self, tolerance=1e-4):
+        """Merge coincident vertices whose every per-vertex attribute also matches within `tolerance`.
+
+        Vertices on UV, normal or weight seams stay split. This geometry is left untouched, so
+        shared or cached files are safe to weld. Returns (geometry, kept, remap): a copy with
+        compacted per-vertex arrays and a remapped `index` without collapsed triangles (their
+        `original_indices` rows are dropped too), the original ids of the kept vertices and the
+        new id of every original vertex.
+        """
+        welded = self.copy()
+        vertex_count = len(self.positions)
+        if not vertex_count:
+            return welded, np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        names = [name for name in self.ARRAY_ATTRIBUTES if name not in ('index', 'original_indices') and
+                 len(getattr(self, name)) == vertex_count]
+        columns = [getattr(self, name) for name in names]
+        columns += [self.vertex_colors[layer] for layer in self.vertex_colors]
+        # raw shape key bytes are exact, decoded ones are compared on the tolerance grid
+        for name in self.shape_key_data:
+            source = self.shape_key_data._sources[name]
+            columns.append(self.shape_key_data[name] if source is None else source[0])
+        kept, remap = weld_map(columns, tolerance)
+        if len(kept) == vertex_count:
+            return welded, kept, remap
+
+        for name in names:
+            setattr(welded, name, getattr(self, name)[kept])
+        welded.vertex_colors = {layer: colors[kept] for layer, colors in self.vertex_colors.items()}
+        welded.shape_key_data = self.shape_key_data.take(kept)
+        index = remap[self.index]
+        collapsed = (index[:, 0] == index[:, 1]) | (index[:, 1] == index[:, 2]) | (index[:, 0] == index[:, 2])
+        welded.index = index[~collapsed].astype(self.index.dtype)
+        if len(self.original_indices) == len(collapsed):
+            welded.original_indices = self.original_indices[~collapsed]
+        return welded, kept, remap
+
+    def make_lazy(self, resolve):
+        """Drop decoded attributes; the first access runs `resolve` and then the matching loader."""
+        for name in list(self.__dict__):
+            if not name.startswith('_'):
+                self._defaults[name] = self.__dict__.pop(name)
+        self._resolve = resolve
+
+    def defer(self, names, loader):
+        """Register `loader(names)` as the callable that assigns `names` on first access.
+
+        A later `defer` of the same name takes precedence, the earlier loader is then
+        only asked for the names it still owns.
+        """
+        if isinstance(names, str):
+            names = (names,)
+        for name in names:
+            self.__dict__.pop(name, None)
+            self._pending[name] = loader
+
+    def __getstate__(self):
+        # lazy loaders close over the HeroFile, so everything is decoded before pickling
+        with self._lock:
+            for name in list(self._defaults) + list(self._pending):
+                getattr(self, name)
+            return {name: value for name, value in self.__dict__.items() if not name.startswith('_')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._defaults = {}
+        self._pending = {}
+        self._resolve = None
+        self._lock = threading.RLock()
+        self._observers = []
+
+    def observe(self, callback):
+        """Call `callback(geometry)` after lazy attributes were decoded, still under the geometry's lock."""
+        self._observers.append(callback)
+
+    def __getattr__(self, name):
+        state = self.__dict__
+        if name.startswith('_') or '_pending' not in state:
+            raise AttributeError(name)
+        with state['_lock']:
+            if name in state:  # loaded by another thread while this one waited
+                return state[name]
+            if state['_resolve'] is not None:
+                resolve, state['_resolve'] = state['_resolve'], None
+                try:
+                    resolve()
+                except Exception:
+                    state['_resolve'] = resolve
+                    raise
+            loader = state['_pending'].get(name)
+            if loader is not None:
+                names = [key for key, value in state['_pending'].items() if value is loader]
+                for key in names:
+                    del state['_pending'][key]
+                loader(names)
+            if name not in state:
+                if name not in state['_defaults']:
+                    raise AttributeError(name)
+                state[name] = state['_defaults'][name]
+            for callback in state['_observers']:
+                callback(self)
+            return state[name]
+
+
+class Skeleton:
+    """Struct-of-arrays bone hierarchy.
+
+    Holds int16 parent ids (-1 for roots), (B,3) float32 rest positions, (B,4) quaternions in file
+    order (x, y, z, w) and (B,3) scales, plus an interned name table. Iterating or indexing yields
+    HeroBone views.
+    """
+
+    def __init__(self, names=(), parent_ids=None, positions=None, quaternions=None, scales=None):
+        self.names = [sys.intern(str(name)) for name in names]
+        count = len(self.names)
+        self.parent_ids = np.full(count, -1, dtype=np.int16)
+        self.positions = np.zeros((count, 3), dtype=np.float32)
+        self.quaternions = np.tile(np.array([0, 0, 0, 1], dtype=np.float32), (count, 1))
+        self.scales = np.ones((count, 3), dtype=np.float32)
+        for attr, value in (('parent_ids', parent_ids), ('positions', positions), ('quaternions', quaternions),
+                            ('scales', scales)):
+            if value is not None:
+                current = getattr(self, attr)
+                setattr(self, attr, np.asarray(value, dtype=current.dtype).reshape(current.shape))
+        self._ids = {}
+        for bone_id, name in enumerate(self.names):
+            self._ids.setdefault(name, bone_id)
+
+    def __repr__(self):
+        return "<Skeleton {} bones>".format(len(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return (HeroBone(self, bone_id) for bone_id in range(len(self.names)))
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            item = self.index(item)
+        elif item < 0:
+            item += len(self.names)
+        if not 0 <= item < len(self.names):
+            raise IndexError(item)
+        return HeroBone(self, item)
+
+    def index(self, name):
+        return self._ids[name]
+
+    def rename(self, bone_id, name):
+        old = self.names[bone_id]
+        if self._ids.get(old) == bone_id:
+            del self._ids[old]
+        self.names[bone_id] = sys.intern(name)
+        self._ids.setdefault(self.names[bone_id], bone_id)
 
 
 class HeroBone:
+    """Lightweight view of one bone in a Skeleton. A bone created on its own gets a private one-bone skeleton."""
+    __slots__ = ('skeleton', 'bone_id')
+
+    def __init__(self, skeleton=None, bone_id=0):
+        self.skeleton = Skeleton(['']) if skeleton is None else skeleton
+        self.bone_id = bone_id
+
+    def __repr__(self):
+        return "<HeroBone {!r} id:{} parent:{}>".format(self.name, self.bone_id, self.parent_id)
+
+    @property
+    def name(self):
+        return self.skeleton.names[self.bone_id]
+
+    @name.setter
+    def name(self, value):
+        self.skeleton.rename(self.bone_id, value)
+
+    @property
+    def parent_id(self):
+        return int(self.skeleton.parent_ids[self.bone_id])
+
+    @parent_id.setter
+    def parent_id(self, value):
+        self.skeleton.parent_ids[self.bone_id] = value
+
+    @property
+    def pos(self):
+        return self.skeleton.positions[self.bone_id]
+
+    @pos.setter
+    def pos(self, value):
+        self.skeleton.positions[self.bone_id] = np.ravel(value)[:3]
+
+    @property
+    def quat(self):
+        return self.skeleton.quaternions[self.bone_id]
+
+    @quat.setter
+    def quat(self, value):
+        self.skeleton.quaternions[self.bone_id] = np.ravel(value)[:4]
+
+    rot = quat
+
+    @property
+    def scale(self):
+        return self.skeleton.scales[self.bone_id]
+
+    @scale.setter
+    def scale(self, value):
+        self.skeleton.scales[self.bone_id] = np.ravel(value)[:3]
 
-    def __init__(self):
-        self.name = ''
-        self.parent_id = -1
-        self.bone_id = -1
-        self.pos = []
-        self.scale = []
-        self.quat = []
-        self.rot = []
+
+class SectionCursor:
+    """Sequential reader over one typed section of a HeroForge file.
+
+    Hands out contiguous slices of the underlying array without copying.
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self.offset = 0
+
+    def __repr__(self):
+        return "<SectionCursor {}/{}>".format(self.offset, len(self.array))
+
+    @property
+    def remaining(self):
+        return len(self.array) - self.offset
+
+    def _check(self, end):
+        if end > len(self.array):
+            raise OffsetOutOfBounds(
+                'Section overrun: requested up to {}, section has {} elements'.format(end, len(self.array)))
+
+    def take(self, count):
+        start = self.offset
+        self._check(start + count)
+        self.offset += count
+        return self.array[start:self.offset]
+
+    def peek(self, count, offset=0):
+        start = self.offset + offset
+        self._check(start + count)
+        return self.array[start:start + count]
+
+    def skip(self, count):
+        self._check(self.offset + count)
+        self.offset += count
+
+    def get(self, offset=0):
+        self._check(self.offset + offset + 1)
+        return self.array[self.offset + offset]
+
+    def next(self, offset=0):
+        ret = self.get(offset)
+        self.offset += 1
+        return ret
 
 
 class HeroFile:
@@ -54,10 +614,14 @@ class HeroFile:
     ge = (2 ** 16) - 1
     H = math.pow(2, 16) - 1
     X = (math.pow(2, 16) - 2) / 2
+    # decoding order of the _init_<stage> methods, each consumes its data from all four sections
+    STAGES = ('settings', 'indices', 'points', 'normals', 'uvs', 'vertex_colors', 'blends', 'weights', 'parent',
+              'poses')
 
-    def __init__(self, path):
-        self.reader = ByteIO(path=path)
+    def __init__(self, path, lazy=False, mmap=False):
+        self.reader = ByteIO(path=path, use_mmap=mmap)
         self.name = Path(path).name
+        self.lazy = lazy
         self.version = 0
         self.i32_count = 0
         self.i16_count = 0
@@ -69,99 +633,181 @@ class HeroFile:
         self.i16_offset = 0
         self.i8_offset = 0
         self.i1_offset = 0
-        self.bit_cursor = 0
 
-        self._i1_array = []
+        self.i32_array = np.array([], dtype=np.float32)
+        self.i16_array = np.array([], dtype=np.uint16)
+        self.i8_array = np.array([], dtype=np.uint8)
+        self.i32_cursor = SectionCursor(self.i32_array)
+        self.i16_cursor = SectionCursor(self.i16_array)
+        self.i8_cursor = SectionCursor(self.i8_array)
+        self._i1_array = np.array([], dtype=bool)
+        self.i1_cursor = SectionCursor(self._i1_array)
 
         self.options = {}
         self.geometry = HeroGeomerty()
         self.vertex_count = 0
+        self.index_count = 0
+        self.weights_per_vertex = 0
+
+    def map_sections(self):
+        buffer = self.reader.get_buffer()
+        if self.i1_offset + math.ceil(self.i1_count / 8) > len(buffer):
+            raise OffsetOutOfBounds('{} is truncated: sections need {} bytes, file has {}'.format(
+                self.name, self.i1_offset + math.ceil(self.i1_count / 8), len(buffer)))
+        self.i32_array = np.frombuffer(buffer, '<f4', self.i32_count, self.i32_offset)
+        self.i16_array = np.frombuffer(buffer, '<u2', self.i16_count, self.i16_offset)
+        self.i8_array = np.frombuffer(buffer, np.uint8, self.i8_count, self.i8_offset)
+        self.i32_cursor = SectionCursor(self.i32_array)
+        self.i16_cursor = SectionCursor(self.i16_array)
+        self.i8_cursor = SectionCursor(self.i8_array)
+        packed_bits = np.frombuffer(buffer, np.uint8, math.ceil(self.i1_count / 8), self.i1_offset)
+        self._i1_array = np.unpackbits(packed_bits, bitorder='little').view(bool)
+        self.i1_cursor = SectionCursor(self._i1_array)
+
+    # offsets below are in bytes relative to the section cursor, like the old seek based readers
 
     def read_float(self, offset=0):
-        self.reader.seek(self.i32_offset + offset)
-        ret = self.reader.read_float()
-        self.i32_offset += 4
-        return ret
+        return float(self.i32_cursor.next(offset // 4))
 
     def read_uint32(self, offset=0):
-        self.reader.seek(self.i32_offset + offset)
-        val = self.read_float()
-        ret = round(val)
-        return ret
+        return round(self.read_float(offset))
 
     def read_uint16(self, offset=0, increment=True):
-        self.reader.seek(self.i16_offset + offset)
-        ret = self.reader.read_uint16()
         if increment:
-            self.i16_offset += 2
-        return ret
+            return int(self.i16_cursor.next(offset // 2))
+        return int(self.i16_cursor.get(offset // 2))
 
     def read_int8(self, offset=0):
-        self.reader.seek(self.i8_offset + offset)
-        ret = self.reader.read_uint8()
-        self.i8_offset += 1
-        return ret
+        return int(self.i8_cursor.next(offset))
 
     def read_string(self, offset=0):
-        self.reader.seek(self.i8_offset + offset)
-        l = self.read_int8()
-        ret = self.reader.read_ascii_string(l)
-        self.i8_offset += len(ret)
-        return ret
+        length = self.read_int8(offset)
+        ret = self.i8_cursor.peek(length, offset).tobytes()
+        self.i8_cursor.skip(length)
+        return ret.strip(b'\x00').decode('latin-1')
 
     def read_bit(self):
-        bit = self._i1_array[self.bit_cursor]
-        self.bit_cursor += 1
-        return bit
+        return bool(self.i1_cursor.next())
 
     def get_quaternion_array(self, e):
-        e *= 4
-        r = np.zeros(e)
-        for i in range(e):
-            r[i] = self.read_uint16() / self.H * 2 - 1
-        return r
+        return self.i16_cursor.take(4 * e).reshape((e, 4)) * np.float32(2 / self.H) - 1
 
     def get_position_array(self, e, t):
-        n = np.zeros(e * 3)
-        for a in range(e):
-            for r in range(3):
-                n[3 * a + r] = (self.read_uint16() - self.X) / self.X * t
-        return n
+        return (self.i16_cursor.take(3 * e).reshape((e, 3)) - np.float32(self.X)) * np.float32(t / self.X)
 
     def get_scale_array(self, e, t):
-        n = np.zeros(e * 3)
-        for a in range(e):
-            for r in range(3):
-                n[3 * a + r] = self.read_uint16() / self.H * t
-        return n
+        return self.i16_cursor.take(3 * e).reshape((e, 3)) * np.float32(t / self.H)
+
+    def _channel_frames(self, frame_count):
+        # constant channels store a single frame
+        return 1 if self.get_bit() else frame_count
 
-    def read(self):
+    def _scale_frames(self, frame_count, joint_scales):
+        if self.get_bit():
+            return 1
+        return frame_count if joint_scales else 0
+
+    def read(self, stats=None):
+        """Decode the file. `stats` is an optional ReadStats-like collector that is told about every stage.
+
+        In lazy mode stages only run once the geometry is first accessed, and the values they
+        defer are decoded later still, so they are not part of the stage's output size.
+        """
         reader = self.reader
         self.version = round(reader.read_float(), 2)
         self.get_start_points()
-        with reader.save_current_pos():
-            reader.seek(self.i1_offset)
-            for _ in range(math.ceil(self.i1_count / 8)):
-                byte = reader.read_int8()
-                for i in range(8):
-                    self._i1_array.append(bool(byte & (1 << i)))
-        self._init_settings()
-        self._init_indices()
-        self._init_points()
-        self._init_normals()
-        self._init_uvs()
-        self._init_vertex_colors()
-        self._init_blends()
-        self._init_weights()
-        self._init_parent()
+        self.map_sections()
+        self._run_stage('settings', stats)
+        if self.lazy:
+            self.geometry.make_lazy(lambda: self._init_geometry(stats))
+        else:
+            self._init_geometry(stats)
+
+    def _init_geometry(self, stats=None):
+        for stage in self.STAGES[1:-1]:
+            self._run_stage(stage, stats)
+        if self.lazy:
+            # poses are the last stage, so their start offsets are simply the current cursor positions
+            state = self.save_cursors()
+            self.geometry.defer(('bones', 'poses', 'locations', 'main_skeleton'),
+                                lambda names: self._replay(state, lambda: self._read_poses(stats)))
+        else:
+            self._read_poses(stats)
+
+    def _read_poses(self, stats=None):
+        try:
+            self._run_stage('poses', stats)
+        except Exception as ex:
+            warnings.warn('Failed to decode poses of {}: {!r}'.format(self.name, ex))
+        if stats is not None:
+            stats.finish(self.remaining_words())
+
+    def _run_stage(self, stage, stats):
+        method = getattr(self, '_init_' + stage)
+        if stats is None:
+            return method()
+        before = self.save_cursors()
+        attributes = {name: id(value) for name, value in self.geometry.__dict__.items()}
+        start = time.perf_counter()
+        error = None
         try:
-            self._init_poses();
-        except:
-            pass
+            method()
+        except Exception as ex:
+            error = ex
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            words = tuple(after - offset for after, offset in zip(self.save_cursors(), before))
+            seen = set()
+            nbytes = sum(output_nbytes(value, seen) for name, value in self.geometry.__dict__.items()
+                         if attributes.get(name) != id(value))
+            stats.stage(stage, seconds, words, nbytes, error)
+
+    def remaining_words(self):
+        """Words left unread in the i32, i16, i8 and i1 sections; all zero after a complete decode."""
+        return (len(self.i32_array) - self.i32_cursor.offset, len(self.i16_array) - self.i16_cursor.offset,
+                len(self.i8_array) - self.i8_cursor.offset, self.i1_count - self.i1_cursor.offset)
+
+    def _store(self, names, decoder, *args):
+        """Assign decoder(*args) to geometry attribute(s) now, or on first access in lazy mode."""
+        if isinstance(names, str):
+            names = (names,)
+            decode = lambda: (decoder(*args),)
+        else:
+            decode = lambda: decoder(*args)
+
+        def assign(wanted):
+            for name, value in zip(names, decode()):
+                if name in wanted:
+                    setattr(self.geometry, name, value)
+
+        if self.lazy:
+            self.geometry.defer(names, assign)
+        else:
+            assign(names)
+
+    def save_cursors(self):
+        return tuple(cursor.offset for cursor in (self.i32_cursor, self.i16_cursor, self.i8_cursor, self.i1_cursor))
+
+    def restore_cursors(self, state):
+        for cursor, offset in zip((self.i32_cursor, self.i16_cursor, self.i8_cursor, self.i1_cursor), state):
+            cursor.offset = offset
+
+    def _replay(self, state, stage):
+        with self.cursors_at(state):
+            stage()
+
+    @contextlib.contextmanager
+    def cursors_at(self, state):
+        entry = self.save_cursors()
+        self.restore_cursors(state)
+        try:
+            yield
+        finally:
+            self.restore_cursors(entry)
 
     def get_bit(self):
-        self.bit_cursor += 1
-        return self._i1_array[self.bit_cursor - 1]
+        return bool(self.i1_cursor.next())
 
     def get_start_points(self):
         reader = self.reader
@@ -179,36 +825,18 @@ class HeroFile:
         self.i1_offset = self.i8_offset + self.i8_count
 
     def _init_settings(self):
-        default_attributes = ["mesh", "normals", "uv1", "uv2", "blendTargets", "blendNormals", "weights", "animations",
-                              "jointScales", "addon", "paintMapping", "singleParent", "frameMappings", "indices32bit",
-                              "originalIndices", "vertexColors"]
-        if self.version >= 1.2:
-            default_attributes.append('posGroups')
-        t = 32
-        if self.version >= 1.25:
-            default_attributes.append('uvSeams')
-            default_attributes.append('rivets')
-            t -= 2
-        r = {}
-        for attr in default_attributes:
-            r[attr] = self.get_bit()
-        if self.version >= 1.2:
-            self.bit_cursor += t
-            self.options = r
-            self.geometry.main_skeleton = not self.options['addon'] and self.options['weights']
+        attributes, padding = settings_layout(self.version)
+        self.options = {attr: self.get_bit() for attr in attributes}
+        self.i1_cursor.skip(padding)
+        self.geometry.main_skeleton = not self.options['addon'] and self.options['weights']
 
     def _init_indices(self):
         if self.options['mesh']:
-            indices_count = self.read_uint32()
-            if self.options['indices32bit']:
-                self.geometry.index = [self.read_uint32() for _ in range(indices_count)]
-            else:
-                self.geometry.index = [self.read_uint16() for _ in range(indices_count)]
+            indices_count = self.index_count = self.read_uint32()
+            cursor = self.i32_cursor if self.options['indices32bit'] else self.i16_cursor
+            self._store('index', decode_indices, cursor.take(indices_count))
             if self.options['originalIndices']:
-                if self.options['indices32bit']:
-                    self.geometry.original_indices = [self.read_uint32() for _ in range(indices_count)]
-                else:
-                    self.geometry.original_indices = [self.read_uint16() for _ in range(indices_count)]
+                self._store('original_indices', decode_indices, cursor.take(indices_count))
 
     def _init_points(self):
         if self.options['mesh']:
@@ -220,123 +848,109 @@ class HeroFile:
             scale = [bbox[3] - bbox[0], bbox[4] - bbox[1], (bbox[5] - bbox[2])]
             self.geometry.offset = [bbox[0] * scale[0], bbox[1] * scale[1], bbox[2] * scale[2]]
             self.geometry.bounds = [bbox[0:3], bbox[3:6]]
-            verts = []
-            for _ in range(vertex_count):
-                verts.append((self.read_uint16() / self.ge * scale[0] + bbox[0],
-                              self.read_uint16() / self.ge * scale[1] + bbox[1],
-                              self.read_uint16() / self.ge * scale[2] + bbox[2]
-                              ))
-                self.geometry.positions = verts
+            raw = self.i16_cursor.take(3 * vertex_count).reshape((-1, 3))
+            self._store('positions', dequantize, raw, bbox[0:3], bbox[3:6], self.ge)
 
     def _init_normals(self):
         if self.options['normals']:
             if self.vertex_count != 0:
-                normals = []
-                r = 0
-                for _ in range(self.vertex_count):
-                    normals.append(self.read_int8() / self.me * 2 - 1)
-                    normals.append(self.read_int8() / self.me * 2 - 1)
-                    normals.append(
-                        (2 * self.get_bit() - 1) * (1 - math.pow(normals[r], 2) - math.pow(normals[r + 1], 2)))
-                    r += 3
-                self.geometry.normals = split(normals, 3)
+                raw = self.i8_cursor.take(2 * self.vertex_count)
+                self._store('normals', decode_normals, raw, self.i1_cursor.take(self.vertex_count), self.me)
 
     def _init_uvs(self):
         if self.options['uv1']:
             uvs = ['uv', 'uv2'] if self.options['uv2'] else ['uv']
             for uv in uvs:
                 n = [self.read_float() for _ in range(4)]
-                s = [n[2] - n[0], n[3] - n[1]]
-                u = []
-                for i in range(self.vertex_count):
-                    u.append((self.read_uint16() / self.ge * s[0] + n[0], self.read_uint16() / self.ge * s[1] + n[1]))
-                setattr(self.geometry, uv, u)
+                raw = self.i16_cursor.take(2 * self.vertex_count).reshape((-1, 2))
+                self._store(uv, dequantize, raw, n[0:2], n[2:4], self.ge)
 
     def _init_vertex_colors(self):
         if self.options['vertexColors']:
             layer_count = self.read_int8()
+            layers = {}
             for t in range(layer_count):
                 layer_name = self.read_string()
-                v_colors = []
-                for _ in range(self.vertex_count):
-                    col = self.read_int8()
-                    v_colors.append(col / 255)
-                    v_colors.append(col / 255)
-                    v_colors.append(col / 255)
-                    v_colors.append(1)
-                self.geometry.vertex_colors[layer_name] = np.array(v_colors).reshape((-1, 4))
+                layers[layer_name] = self.i8_cursor.take(self.vertex_count)
+            self._store('vertex_colors', decode_vertex_colors, layers)
 
     def _init_blends(self):
         if self.options['blendTargets']:
             shape_key_count = self.read_int8()
             if shape_key_count:
-                shape_key_data = {}
+                shape_key_data = ShapeKeyData()
                 for shape_key_id in range(shape_key_count):
                     shape_key_name = self.read_string()
-                    o = [self.read_float() for _ in range(6)]
-                    u = [o[3] - o[0], o[4] - o[1], o[5] - o[2]]
-                    c = []
-                    for d in range(self.vertex_count):
-                        c.append(self.read_int8() / self.me * u[0] + o[0])
-                        c.append(self.read_int8() / self.me * u[1] + o[1])
-                        c.append(self.read_int8() / self.me * u[2] + o[2])
-                    shape_key_data[shape_key_name] = split(c, 3)
+                    o = self.i32_cursor.take(6)
+                    raw = self.i8_cursor.take(3 * self.vertex_count).reshape((-1, 3))
+                    shape_key_data.add(shape_key_name, raw, o[0:3], o[3:6])
                     if self.options['blendNormals']:
-                        for _ in range(self.vertex_count):
-                            self.read_int8()
-                            self.read_int8()
-                            self.get_bit()
+                        # blend normals are not used, step over them
+                        self.i8_cursor.skip(2 * self.vertex_count)
+                        self.i1_cursor.skip(self.vertex_count)
                 self.geometry.shape_key_data = shape_key_data
 
     def _init_weights(self):
         if self.options['weights']:
             self.geometry.skinned = True
-            weight_per_vert = self.read_int8()
-            additional_weights = max(0, weight_per_vert - 4)
-            skin_indices = np.zeros(4 * self.vertex_count, dtype=np.int16)
-            additional_skin_indices = np.zeros(additional_weights * self.vertex_count, dtype=np.int16)
-            u = 4 if weight_per_vert < 4 else weight_per_vert
-            for l in range(u):
-                if weight_per_vert > l:
-                    if l < 4:
-                        for t in range(self.vertex_count):
-                            skin_indices[4 * t + l] = self.read_uint16(2 * (t * weight_per_vert + l), False)
-                    else:
-                        for t in range(self.vertex_count):
-                            additional_skin_indices[t * additional_weights + (l - 4)] = self.read_uint16(
-                                2 * (t * additional_weights + l), False)
-            self.geometry.skin_indices = skin_indices.reshape((-1, u,))
-            self.geometry.additional_skin_indices = additional_skin_indices.reshape((-1, u,))
-            self.i16_offset = self.i16_offset + weight_per_vert * self.vertex_count * 2;
-            skin_weights = np.zeros(4 * self.vertex_count, dtype=np.float32)
-            additional_skin_weights = np.zeros(additional_weights * self.vertex_count, dtype=np.float32)
-            u = 4 if weight_per_vert < 4 else weight_per_vert
-            for f in range(u):
-                if weight_per_vert > f:
-                    if f < 4:
-                        for c in range(self.vertex_count):
-                            skin_weights[4 * c + f] = self.read_uint16(2 * (c * weight_per_vert + f), False) / self.ge
-                    else:
-                        for c in range(self.vertex_count):
-                            additional_skin_weights[c * additional_weights + (f - 4)] = self.read_uint16(
-                                2 * (c * weight_per_vert + f), False) / self.ge
-            self.geometry.skin_weights = skin_weights.reshape((-1, u))
-            self.geometry.additional_skin_weights = additional_skin_weights.reshape((-1, weight_per_vert))
-            self.i16_offset = self.i16_offset + weight_per_vert * self.vertex_count * 2
+            weight_per_vert = self.weights_per_vertex = self.read_int8()
+            block_size = weight_per_vert * self.vertex_count
+            indices = self.i16_cursor.take(block_size).reshape((self.vertex_count, weight_per_vert))
+            weights = self.i16_cursor.take(block_size).reshape((self.vertex_count, weight_per_vert))
+            self._store(('skin_indices', 'additional_skin_indices'), split_influences, indices, np.int16)
+            self._store(('skin_weights', 'additional_skin_weights'), split_influences, weights, np.float32, self.ge)
 
     def _init_parent(self):
         if self.options['singleParent']:
             name = self.read_string()
             e = self.read_uint16()
-            r = np.zeros(4 * self.vertex_count)
-            i = np.zeros(4 * self.vertex_count)
-            a = 4 * self.vertex_count
-            for n in range(a):
-                r[n] = e if n % 4 == 0 else 0
-                i[n] = 1 if n % 4 == 0 else 0
-
-            self.geometry.skin_indices = r.reshape((-1, 4))
-            self.geometry.skin_weights = i.reshape((-1, 4))
+            self._store(('skin_indices', 'skin_weights'), single_parent_influences, self.vertex_count, e)
+
+    def _read_track(self, frame_count, position_scale, scale_scale, joint_scales, frame_mapping):
+        """(frames,3) positions, (frames,4) quaternions and (frames,3) scales of one bone in a pose clip."""
+        track = {
+            "pos": self.get_position_array(self._channel_frames(frame_count), position_scale),
+            "rot": self.get_quaternion_array(self._channel_frames(frame_count)),
+        }
+        scale_frames = self._scale_frames(frame_count, joint_scales)
+        track["scl"] = self.get_scale_array(scale_frames, scale_scale) if scale_frames else np.ones((1, 3), np.float32)
+        track["frameMapping"] = frame_mapping
+        return track
+
+    def _read_skeleton(self, bone_count, frame_count, position_scale, scale_scale, joint_scales, has_parents):
+        """Read rest transforms for `bone_count` bones into one Skeleton; animated channels keep their first frame.
+
+        Channels without any frame (an animated channel of a zero frame clip) keep the identity.
+        """
+        names = []
+        parent_ids = np.full(bone_count, -1, dtype=np.int16)
+        raw = np.zeros((bone_count, 10), dtype=np.uint16)  # position, quaternion, scale
+        stored = np.zeros((bone_count, 3), dtype=bool)  # position, quaternion, scale present
+        for bone_id in range(bone_count):
+            if has_parents:
+                parent_id = self.read_uint16()
+                if parent_id == 5e3:
+                    self.geometry.main_skeleton = True
+                else:
+                    parent_ids[bone_id] = parent_id
+            names.append(self.read_string())
+            channels = ((0, 3, self._channel_frames(frame_count)), (3, 4, self._channel_frames(frame_count)),
+                        (7, 3, self._scale_frames(frame_count, joint_scales)))
+            for channel, (start, width, frames) in enumerate(channels):
+                values = self.i16_cursor.take(width * frames)
+                if len(values):
+                    raw[bone_id, start:start + width] = values[:width]
+                    stored[bone_id, channel] = True
+        positions = np.zeros((bone_count, 3), dtype=np.float32)
+        quaternions = np.zeros((bone_count, 4), dtype=np.float32)
+        quaternions[:, 3] = 1
+        scales = np.ones((bone_count, 3), dtype=np.float32)
+        has_position, has_rotation, has_scale = stored.T
+        positions[has_position] = ((raw[has_position, 0:3] - np.float32(self.X)) / np.float32(self.X) *
+                                   np.float32(position_scale))
+        quaternions[has_rotation] = raw[has_rotation, 3:7] / np.float32(self.H) * 2 - 1
+        scales[has_scale] = raw[has_scale, 7:10] / np.float32(self.H) * np.float32(scale_scale)
+        return Skeleton(names, parent_ids, positions, quaternions, scales)
 
     def _init_poses(self):
         if self.options['animations']:
@@ -344,59 +958,29 @@ class HeroFile:
             if self.options['frameMappings']:
                 n = self.read_uint16()
                 a = [self.read_uint16() for _ in range(n)]
+                i = {}
                 if n:
-                    i = {}
                     for s in range(n):
                         i[a[s]] = s
+            frame_mapping = i if self.options["frameMappings"] else None
             p = self.read_float()
             m = self.options['jointScales']
             g = self.read_float() if m else 1
             poses = {}
             locators = {}
-            bones = []
+            bones = Skeleton()
             for y in range(bone_count):
                 o = self.read_string()
                 l = self.read_uint16()
                 u = self.read_uint16()
-                # print(o, l, u)
-                v = lambda: {
-                    "pos": self.get_position_array(1, p) if self.get_bit() else self.get_position_array(u, p),
-                    "rot": self.get_quaternion_array(1) if self.get_bit() else self.get_quaternion_array(u),
-                    "scl": self.get_scale_array(1, g) if self.get_bit() else self.get_scale_array(u, g) if m else [1, 1,
-                                                                                                                   1],
-                    "frameMapping": i if self.options["frameMappings"] else None
-                }
                 if o == 'main':
-                    for S in range(l):
-                        b = self.read_uint16()
-                        w = HeroBone()
-                        w.bone_id = S
-                        w.name = self.read_string()
-                        # print(w.name)
-                        if b == 5e3:
-                            self.geometry.main_skeleton = True
-                            w.parent_id = -1
-                            print(w.name, b, S)
-                        else:
-                            w.parent_id = b
-                        k = v()
-                        w.pos = k['pos']
-                        w.quat = k['rot']
-                        w.scale = k['scl']
-                        bones.append(w)
+                    bones = self._read_skeleton(l, u, p, g, m, True)
                 elif o == 'locators':
-                    for R in range(l):
-                        bone = HeroBone()
-                        bone.name = self.read_string()
-                        C = v()
-                        bone.pos = C['pos']
-                        bone.scale = C['cls']
-                        bone.quat = C['rot']
-                        locators[bone.name] = bone
+                    locators = {locator.name: locator for locator in self._read_skeleton(l, u, p, g, m, False)}
                 else:
                     c = {}
                     for x in range(l):
-                        c[self.read_string()] = v()
+                        c[self.read_string()] = self._read_track(u, p, g, m, frame_mapping)
                     poses[o] = c
             # print(h)
             self.geometry.bones = bones
@@ -404,6 +988,13 @@ class HeroFile:
             self.geometry.locations = locators
 
 
+def read_hero(path, **hero_kwargs):
+    """Parsed HeroFile(path, **hero_kwargs); touches neither bpy nor shared state, so it runs on any worker."""
+    hero = HeroFile(str(path), **hero_kwargs)
+    hero.read()
+    return hero
+
+
 if __name__ == '__main__':
     a = HeroFile('hf_bodyUpper_loRez_dragon.ckb')
     a.read()
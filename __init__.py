@@ -1,6 +1,12 @@
-import bpy
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+try:
+    import bpy
+except ImportError:  # headless use, e.g. the batch converter in cli.py
+    bpy = None
+
 bl_info = {
     "name": "HeroForge model import",
     "author": "RED_EYE",
@@ -11,47 +17,65 @@ bl_info = {
     "category": "Import-Export"
 }
 
-from bpy.props import StringProperty, BoolProperty, CollectionProperty
-
-
-class HeroForge_OT_operator(bpy.types.Operator):
-    """Load HeroForge ckb models"""
-    bl_idname = "import_mesh.ckb"
-    bl_label = "Import HeroForge model"
-    bl_options = {'UNDO'}
-
-    filepath = StringProperty(
-        subtype='FILE_PATH',
-    )
-    files = CollectionProperty(name='File paths', type=bpy.types.OperatorFileListElement)
-    filter_glob = StringProperty(default="*.ckb", options={'HIDDEN'})
-
-    def execute(self, context):
-        from . import bl_loader
-        directory = Path(self.filepath).parent.absolute()
-        for file in self.files:
-            importer = bl_loader.HeroIO(str(directory / file.name))
-
-        return {'FINISHED'}
-
-    def invoke(self, context, event):
-        wm = context.window_manager
-        wm.fileselect_add(self)
-        return {'RUNNING_MODAL'}
-
-
-def menu_import(self, context):
-    self.layout.operator(HeroForge_OT_operator.bl_idname, text="HeroForge model (.ckb)")
-
-
-def register():
-    bpy.utils.register_module(__name__)
-    bpy.types.INFO_MT_file_import.append(menu_import)
-
-
-def unregister():
-    bpy.utils.unregister_module(__name__)
-    bpy.types.INFO_MT_file_import.remove(menu_import)
+if bpy is not None:
+    from bpy.props import StringProperty, BoolProperty, CollectionProperty
+
+    class HeroForge_OT_operator(bpy.types.Operator):
+        """Load HeroForge ckb models"""
+        bl_idname = "import_mesh.ckb"
+        bl_label = "Import HeroForge model"
+        bl_options = {'UNDO'}
+
+        filepath = StringProperty(
+            subtype='FILE_PATH',
+        )
+        files = CollectionProperty(name='File paths', type=bpy.types.OperatorFileListElement)
+        filter_glob = StringProperty(default="*.ckb", options={'HIDDEN'})
+
+        def execute(self, context):
+            from . import bl_loader
+            from .HeroForge import read_hero
+            directory = Path(self.filepath).parent.absolute()
+            paths = [str(directory / file.name) for file in self.files]
+            wm = context.window_manager
+            failed = 0
+            wm.progress_begin(0, len(paths))
+            # parsing is NumPy bound and thread safe, bpy is only touched from this thread
+            with ThreadPoolExecutor(max(1, min(len(paths), os.cpu_count() or 1))) as pool:
+                futures = {pool.submit(read_hero, path): path for path in paths}
+                for done, future in enumerate(as_completed(futures), 1):
+                    path = futures[future]
+                    try:
+                        bl_loader.HeroIO(path, future.result())
+                    except Exception as ex:
+                        failed += 1
+                        self.report({'ERROR'}, 'Failed to import {}: {}'.format(Path(path).name, ex))
+                    wm.progress_update(done)
+            wm.progress_end()
+            if failed:
+                self.report({'WARNING'}, 'Imported {} of {} files'.format(len(paths) - failed, len(paths)))
+                if failed == len(paths):
+                    return {'CANCELLED'}
+            return {'FINISHED'}
+
+        def invoke(self, context, event):
+            wm = context.window_manager
+            wm.fileselect_add(self)
+            return {'RUNNING_MODAL'}
+
+
+    def menu_import(self, context):
+        self.layout.operator(HeroForge_OT_operator.bl_idname, text="HeroForge model (.ckb)")
+
+
+    def register():
+        bpy.utils.register_module(__name__)
+        bpy.types.INFO_MT_file_import.append(menu_import)
+
+
+    def unregister():
+        bpy.utils.unregister_module(__name__)
+        bpy.types.INFO_MT_file_import.remove(menu_import)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""asyncio front end for loading HeroForge files without blocking the event loop.
+
+    hero = await load_hero('part.ckb', timeout=2)
+    heroes = await load_many(paths)
+    async for path, result in iter_loaded(paths):
+        ...
+
+Reading and parsing run on a thread pool, at most `concurrency` files at a time. A cancelled or
+timed out load that has not started yet never runs; one that already started finishes in the
+background (parsing can not be interrupted) but keeps its slot until then, so the limit holds.
+"""
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .HeroForge import read_hero
+except ImportError:
+    from HeroForge import read_hero
+
+
+class HeroLoader:
+    """Loads HeroFile objects on an executor with bounded concurrency.
+
+    `cache` is an optional cache.HeroFileCache (or anything with a get(path, **hero_kwargs)
+    method) consulted instead of parsing. `hero_kwargs` are passed on to HeroFile.
+    """
+
+    def __init__(self, concurrency=None, executor=None, cache=None, **hero_kwargs):
+        self.concurrency = concurrency or min(8, os.cpu_count() or 1)
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(self.concurrency, thread_name_prefix='HeroLoader')
+        self.cache = cache
+        self.hero_kwargs = hero_kwargs
+        self._semaphores = weakref.WeakKeyDictionary()  # one per event loop
+
+    def __repr__(self):
+        return "<HeroLoader concurrency {}>".format(self.concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+
+    def _submit(self, path):
+        if self.cache is not None:
+            return self.executor.submit(self.cache.get, str(path), **self.hero_kwargs)
+        return self.executor.submit(read_hero, path, **self.hero_kwargs)
+
+    async def _load(self, path):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        await semaphore.acquire()
+        try:
+            future = self._submit(path)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_):
+            # the slot is freed when the work really ends, not when the awaiting task is cancelled
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:  # the loop is already closed
+                pass
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def load(self, path, timeout=None):
+        """Parsed HeroFile for `path`; raises asyncio.TimeoutError after `timeout` seconds, queueing included."""
+        return await asyncio.wait_for(self._load(path), timeout)
+
+    async def load_many(self, paths, timeout=None, return_exceptions=False):
+        """Parsed HeroFiles for `paths` in order; `timeout` applies to every file on its own."""
+        return await asyncio.gather(*(self.load(path, timeout) for path in paths),
+                                    return_exceptions=return_exceptions)
+
+    async def iter_loaded(self, paths, timeout=None):
+        """Yield (path, HeroFile or exception) as loads complete.
+
+        At most 2 * concurrency loads are pending at once, so any number of paths can be
+        streamed. Leaving the loop early cancels the loads still pending.
+        """
+        async def load(path):
+            try:
+                return path, await self.load(path, timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                return path, ex
+
+        paths = iter(paths)
+        pending = set()
+        try:
+            while True:
+                for path in paths:
+                    pending.add(asyncio.ensure_future(load(path)))
+                    if len(pending) >= 2 * self.concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+_default_loader = None
+
+
+def default_loader():
+    """Process-wide HeroLoader used by the module level functions."""
+    global _default_loader
+    if _default_loader is None:
+        _default_loader = HeroLoader()
+    return _default_loader
+
+
+async def load_hero(path, timeout=None, loader=None):
+    return await (loader or default_loader()).load(path, timeout)
+
+
+async def load_many(paths, timeout=None, return_exceptions=False, loader=None):
+    return await (loader or default_loader()).load_many(paths, timeout, return_exceptions)
+
+
+def iter_loaded(paths, timeout=None, loader=None):
+    return (loader or default_loader()).iter_loaded(paths, timeout)
@@ -0,0 +1,124 @@
+"""Vectorized sampling of decoded pose clips.
+
+Times are expressed in frames. When a clip carries a frameMapping ({frame: key index}), key i
+sits at the frame that maps to i; otherwise key i sits at frame i.
+"""
+import numpy as np
+
+try:
+    from .HeroForge import Skeleton
+except ImportError:
+    from HeroForge import Skeleton
+
+CHANNELS = (('pos', 3), ('rot', 4), ('scl', 3))
+
+
+def normalize(quaternions):
+    norm = np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    return quaternions / np.where(norm == 0, 1, norm)
+
+
+def nlerp(q0, q1, alpha):
+    """Normalized lerp along the shortest arc; alpha broadcasts against the leading axes."""
+    q1 = np.where(np.sum(q0 * q1, axis=-1, keepdims=True) < 0, -q1, q1)
+    return normalize(q0 + (q1 - q0) * alpha[..., None])
+
+
+def slerp(q0, q1, alpha):
+    q0 = normalize(q0)
+    q1 = normalize(q1)
+    dot = np.sum(q0 * q1, axis=-1, keepdims=True)
+    q1 = np.where(dot < 0, -q1, q1)
+    dot = np.clip(np.abs(dot), 0, 1)
+    theta = np.arccos(dot)
+    sin_theta = np.sin(theta)
+    near = sin_theta < 1e-5
+    safe_sin = np.where(near, 1, sin_theta)
+    alpha = alpha[..., None]
+    w0 = np.where(near, 1 - alpha, np.sin((1 - alpha) * theta) / safe_sin)
+    w1 = np.where(near, alpha, np.sin(alpha * theta) / safe_sin)
+    return normalize(w0 * q0 + w1 * q1)
+
+
+def clip_key_times(tracks):
+    """Frame time of every key of a clip, following its frameMapping when there is a usable one."""
+    key_count = max([len(track[name]) for track in tracks.values() for name, _ in CHANNELS] or [1])
+    mapping = next((track['frameMapping'] for track in tracks.values() if track.get('frameMapping')), None)
+    if mapping and len(mapping) >= key_count:
+        times = np.zeros(len(mapping), dtype=np.float32)
+        for frame, key in mapping.items():
+            times[key] = frame
+        times = times[:key_count]
+        if np.all(np.diff(times) > 0):
+            return times
+    return np.arange(key_count, dtype=np.float32)
+
+
+class ClipSampler:
+    """Samples every bone of one pose clip at any number of times in a single call.
+
+    Tracks are packed once into (B, K, 3/4) arrays, constant channels are broadcast across the K
+    keys, and bones of `skeleton` missing from the clip hold their rest transform.
+    """
+
+    def __init__(self, tracks, skeleton=None, rotation='nlerp'):
+        if rotation not in ('nlerp', 'slerp'):
+            raise ValueError('Unknown rotation interpolation {!r}'.format(rotation))
+        self.rotation = rotation
+        if skeleton is not None and len(skeleton):
+            self.bone_names = list(skeleton.names)
+        else:
+            self.bone_names = list(tracks)
+            skeleton = Skeleton(self.bone_names)
+        self.key_times = clip_key_times(tracks)
+        key_count = len(self.key_times)
+
+        rest = {'pos': skeleton.positions, 'rot': skeleton.quaternions, 'scl': skeleton.scales}
+        self.keys = {}
+        for name, width in CHANNELS:
+            keys = np.repeat(rest[name][:, None, :], key_count, axis=1)
+            for bone_id, bone_name in enumerate(self.bone_names):
+                track = tracks.get(bone_name)
+                if track is not None:
+                    keys[bone_id] = np.asarray(track[name], dtype=np.float32).reshape((-1, width))[:key_count]
+            self.keys[name] = keys
+
+    def __repr__(self):
+        return "<ClipSampler {} bones {} keys>".format(len(self.bone_names), len(self.key_times))
+
+    @property
+    def duration(self):
+        return float(self.key_times[-1] - self.key_times[0])
+
+    def _interval(self, times, loop):
+        times = np.atleast_1d(np.asarray(times, dtype=np.float32))
+        start = self.key_times[0]
+        if loop and self.duration > 0:
+            times = start + np.mod(times - start, self.duration)
+        times = np.clip(times, start, self.key_times[-1])
+        right = np.clip(np.searchsorted(self.key_times, times, side='right'), 1, len(self.key_times) - 1)
+        left = right - 1
+        if len(self.key_times) == 1:
+            return np.zeros_like(left), np.zeros_like(left), np.zeros(times.shape, dtype=np.float32)
+        span = self.key_times[right] - self.key_times[left]
+        alpha = (times - self.key_times[left]) / span
+        return left, right, alpha.astype(np.float32)
+
+    def sample(self, times, loop=False):
+        """Dict of 'pos' (T,B,3), 'rot' (T,B,4) and 'scl' (T,B,3) float32 arrays at frame `times`."""
+        left, right, alpha = self._interval(times, loop)
+        ret = {}
+        for name, _ in CHANNELS:
+            k0 = self.keys[name][:, left].swapaxes(0, 1)
+            k1 = self.keys[name][:, right].swapaxes(0, 1)
+            weights = np.broadcast_to(alpha[:, None], k0.shape[:2])
+            if name == 'rot':
+                ret[name] = (slerp if self.rotation == 'slerp' else nlerp)(k0, k1, weights)
+            else:
+                ret[name] = k0 + (k1 - k0) * weights[..., None]
+        return ret
+
+
+def sample_clip(geometry, clip_name, times, rotation='nlerp', loop=False):
+    """Sample `clip_name` of a decoded HeroGeomerty for every bone of its skeleton."""
+    return ClipSampler(geometry.poses[clip_name], geometry.bones, rotation).sample(times, loop)
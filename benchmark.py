@@ -0,0 +1,181 @@
+"""Per-stage parser benchmarks on synthetic .ckb files, with a regression check against a saved baseline.
+
+    python -m HeroForge_parser.benchmark --save baseline.json
+    python -m HeroForge_parser.benchmark --baseline baseline.json --threshold 0.25
+
+Every scenario is written with synthetic.write_ckb, then each HeroFile stage is timed on its own.
+Times are the median of --repeat runs, with the median absolute deviation kept as a noise estimate;
+peak memory comes from one extra run under tracemalloc so the tracing overhead does not leak into
+the times.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    from .HeroForge import HeroFile
+    from .synthetic import write_ckb
+except ImportError:
+    from HeroForge import HeroFile
+    from synthetic import write_ckb
+
+SCENARIOS = {
+    'legacy': dict(version=1.1, vertex_count=2000, shape_keys=2, bones=8, frames=10),
+    'prop': dict(version=1.4, vertex_count=5000, shape_keys=0, bones=0, poses=0, weights=False, animations=False),
+    'part': dict(version=1.4, vertex_count=20000, shape_keys=8, bones=60, frames=30, locators=4),
+    'face': dict(version=1.4, vertex_count=30000, shape_keys=48, bones=80, frames=30),
+    'body': dict(version=1.4, vertex_count=200000, shape_keys=12, bones=120, frames=60, poses=3, indices32bit=True),
+}
+# bytes per item of the i32, i16, i8 and i1 sections
+ITEM_BYTES = (4, 2, 1, 1 / 8)
+
+
+def _cursors(hero):
+    return hero.i32_cursor, hero.i16_cursor, hero.i8_cursor, hero.i1_cursor
+
+
+def run_stages(path, trace_memory=False):
+    """Parse `path` once, stage by stage.
+
+    Returns ({stage: {'seconds', 'bytes'[, 'peak_bytes']}}, the parsed HeroFile).
+    """
+    results = {}
+
+    def measure(name, stage):
+        offsets = [cursor.offset for cursor in _cursors(hero)]
+        if trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        stage()
+        seconds = time.perf_counter() - start
+        entry = results[name] = {'seconds': seconds}
+        entry['bytes'] = sum((cursor.offset - offset) * size
+                             for cursor, offset, size in zip(_cursors(hero), offsets, ITEM_BYTES))
+        if trace_memory:
+            entry['peak_bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        hero = HeroFile(str(path))
+
+        def header():
+            hero.version = round(hero.reader.read_float(), 2)
+            hero.get_start_points()
+            hero.map_sections()
+
+        measure('header', header)
+        for stage in HeroFile.STAGES:
+            measure(stage, getattr(hero, '_init_' + stage))
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return results, hero
+
+
+def _median_seconds(entry, runs):
+    entry['seconds'] = statistics.median(runs)
+    entry['noise_seconds'] = statistics.median(abs(seconds - entry['seconds']) for seconds in runs)
+
+
+def benchmark_file(path, repeat=15):
+    """Median-of-`repeat` seconds and noise, consumed bytes, peak memory, MB/s and vertices/s per stage and in total."""
+    runs = [run_stages(path) for _ in range(repeat)]
+    totals = [sum(entry['seconds'] for entry in run.values()) for run, _ in runs]
+    results, hero = runs[0]
+    for stage, entry in results.items():
+        _median_seconds(entry, [run[stage]['seconds'] for run, _ in runs])
+    memory, _ = run_stages(path, trace_memory=True)
+
+    vertex_count = hero.vertex_count
+    results['total'] = {'bytes': os.path.getsize(path)}
+    _median_seconds(results['total'], totals)
+    memory['total'] = {'peak_bytes': max(entry['peak_bytes'] for entry in memory.values())}
+    for stage, entry in results.items():
+        entry['peak_bytes'] = memory[stage]['peak_bytes']
+        seconds = max(entry['seconds'], 1e-9)
+        entry['mb_per_s'] = entry['bytes'] / seconds / 1e6
+        entry['vertices_per_s'] = vertex_count / seconds
+    return results
+
+
+def run_scenarios(names=None, repeat=15, directory=None):
+    """{scenario: benchmark_file results} for SCENARIOS `names` (all by default)."""
+    names = list(SCENARIOS) if names is None else names
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        results = {}
+        for name in names:
+            path = os.path.join(tmp, name + '.ckb')
+            write_ckb(path, **SCENARIOS[name])
+            results[name] = benchmark_file(path, repeat)
+        return results
+
+
+def check_regressions(results, baseline, threshold=0.25, min_seconds=5e-3, noise_factor=3):
+    """Messages for every stage that got more than `threshold` slower or hungrier than in `baseline`.
+
+    A slowdown must also exceed `min_seconds` and `noise_factor` times the summed noise of both
+    runs, so millisecond stages are not failed on scheduler jitter.
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, entry in stages.items():
+            reference = baseline.get(scenario, {}).get(stage)
+            if reference is None:
+                continue
+            noise = noise_factor * (entry.get('noise_seconds', 0) + reference.get('noise_seconds', 0))
+            for key, floor in (('seconds', max(min_seconds, noise)), ('peak_bytes', 0)):
+                if entry[key] - reference[key] <= floor:
+                    continue
+                if entry[key] > reference[key] * (1 + threshold):
+                    regressions.append('{} {} {}: {:.4g} vs baseline {:.4g} (+{:.0%})'.format(
+                        scenario, stage, key, entry[key], reference[key], entry[key] / max(reference[key], 1e-12) - 1))
+    return regressions
+
+
+def format_results(results):
+    lines = ['{:<8} {:<14} {:>10} {:>12} {:>10} {:>10} {:>12}'.format(
+        'scenario', 'stage', 'ms', 'bytes', 'peak KiB', 'MB/s', 'Mvert/s')]
+    for scenario, stages in results.items():
+        for stage, entry in stages.items():
+            lines.append('{:<8} {:<14} {:>10.3f} {:>12.0f} {:>10.1f} {:>10.1f} {:>12.2f}'.format(
+                scenario, stage, entry['seconds'] * 1000, entry['bytes'], entry['peak_bytes'] / 1024,
+                entry['mb_per_s'], entry['vertices_per_s'] / 1e6))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the HeroForge parser stage by stage')
+    parser.add_argument('-s', '--scenario', action='append', choices=list(SCENARIOS),
+                        help='scenario to run, may be repeated (default: all)')
+    parser.add_argument('-r', '--repeat', type=int, default=15, help='runs per scenario, the median time is kept')
+    parser.add_argument('--save', help='write the results as JSON, for use as a later --baseline')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before failing (0.25 = 25%%)')
+    parser.add_argument('--min-ms', type=float, default=5.0, help='slowdowns below this many ms never fail')
+    args = parser.parse_args(argv)
+
+    results = run_scenarios(args.scenario, args.repeat)
+    print(format_results(results))
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = check_regressions(results, json.load(file), args.threshold, args.min_ms / 1000)
+        for message in regressions:
+            print('REGRESSION', message, file=sys.stderr)
+        if regressions:
+            return 1
+        print('No regressions above {:.0%}'.format(args.threshold), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
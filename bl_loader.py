@@ -2,21 +2,47 @@ import random
 from pathlib import Path
 from typing import Dict
 
-from .HeroForge import HeroBone
+from .HeroForge import HeroBone, read_hero
 from . import HeroForge
+from .shape_keys import ShapeKeyMixer
 
 import bpy
 from mathutils import *
-
-from .ByteIO import split
+import numpy as np
+
+
+def loop_buffer(values, loop_vertices, width):
+    """Flat float32 buffer of per-vertex `values` spread over the mesh loops, for foreach_set."""
+    values = np.asarray(values, dtype=np.float32).reshape((len(values), -1))
+    return values[loop_vertices, :width].ravel()
+
+
+def weight_batches(skin_indices, skin_weights):
+    """(bone, weight, vertex indices) for every distinct non-zero weight of every bone."""
+    skin_indices = np.asarray(skin_indices)
+    skin_weights = np.asarray(skin_weights, dtype=np.float32)
+    vertices = np.repeat(np.arange(len(skin_indices)), skin_indices.shape[1])
+    bones = skin_indices.ravel()
+    weights = skin_weights.ravel()
+    used = weights != 0
+    if not used.any():
+        return
+    vertices, bones, weights = vertices[used][::-1], bones[used][::-1], weights[used][::-1]
+    # a bone listed twice for one vertex keeps its last weight, as with sequential 'REPLACE' adds
+    _, last = np.unique(np.stack([vertices, bones.astype(vertices.dtype)]), axis=1, return_index=True)
+    vertices, bones, weights = vertices[last], bones[last], weights[last]
+    order = np.lexsort((weights, bones))
+    vertices, bones, weights = vertices[order], bones[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, (bones[1:] != bones[:-1]) | (weights[1:] != weights[:-1])])
+    for start, end in zip(starts, np.r_[starts[1:], len(bones)]):
+        yield int(bones[start]), float(weights[start]), vertices[start:end].tolist()
 
 
 class HeroIO:
-    def __init__(self, path: str = ''):
+    def __init__(self, path: str = '', hero: HeroForge.HeroFile = None):
         self.path = Path(path)
         self.name = self.path.stem
-        self.hero = HeroForge.HeroFile(path)
-        self.hero.read()
+        self.hero = hero if hero is not None else read_hero(path)
 
         self.armature_obj = None
         self.armature = None
@@ -24,6 +50,7 @@ class HeroIO:
         # just a temp containers
         self.mesh_obj = None
         self.mesh_data = None
+        self.geometry = None
 
         self.create_models()
         # bpy.ops.object.mode_set(mode='OBJECT')
@@ -61,7 +88,9 @@ class HeroIO:
             # mat = Matrix(fix_matrix(se_bone['matrix']))
             mat_loc = Matrix.Translation(se_bone.pos)
             mat_sca = Matrix.Scale(1, 4, se_bone.scale)
-            eul = Quaternion(se_bone.quat).to_euler()
+            # HeroBone.quat is (x, y, z, w), mathutils wants (w, x, y, z)
+            x, y, z, w = se_bone.quat
+            eul = Quaternion((w, x, y, z)).to_euler()
             eul.order = 'ZYX'
             mat_rot = eul.to_matrix().to_4x4()
             mat_out = mat_loc * mat_rot * mat_sca
@@ -109,6 +138,9 @@ class HeroIO:
         return mat_ind
 
     def build_meshes(self):
+        # replaces a remove_doubles pass, but keeps vertices split along UV/normal/weight seams
+        geometry, _, _ = self.hero.geometry.weld(0.0001)
+        self.geometry = geometry
         mesh_obj = bpy.data.objects.new(self.hero.name, bpy.data.meshes.new(self.hero.name + '_MESH'))
         bpy.context.scene.objects.link(mesh_obj)
         mesh = mesh_obj.data
@@ -120,29 +152,32 @@ class HeroIO:
 
         # bones = [bone_list[i] for i in remap_list]
 
-        if len(self.hero.geometry.skin_indices):
-            indices = set(self.hero.geometry.skin_indices.reshape((-1,)))
+        if len(geometry.skin_indices):
+            indices = set(geometry.skin_indices.reshape((-1,)))
             # print(indices)
             weight_groups = {str(bone): mesh_obj.vertex_groups.new(str(bone)) for bone in
                              indices}
-        uvs = self.hero.geometry.uv
         print('Building mesh:', self.hero.name)
-        mesh.from_pydata(self.hero.geometry.positions, [], split(self.hero.geometry.index))
-        mesh.update()
+        index = np.asarray(geometry.index, dtype=np.int32).reshape((-1, 3))
+        mesh.vertices.add(len(geometry.positions))
+        mesh.vertices.foreach_set('co', np.asarray(geometry.positions, dtype=np.float32).ravel())
+        mesh.loops.add(index.size)
+        mesh.loops.foreach_set('vertex_index', index.ravel())
+        mesh.polygons.add(len(index))
+        mesh.polygons.foreach_set('loop_start', np.arange(0, index.size, 3, dtype=np.int32))
+        mesh.polygons.foreach_set('loop_total', np.full(len(index), 3, dtype=np.int32))
+        # from_pydata used to derive the edges, foreach_set leaves that to update()
+        mesh.update(calc_edges=True)
         # mesh_obj.scale = self.hero.geometry.scale
         # mesh_obj.location = self.hero.geometry.offset
+        loop_vertices = np.zeros(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_vertices)
         mesh.uv_textures.new()
-        uv_data = mesh.uv_layers[0].data
-        for i in range(len(uv_data)):
-            u = uvs[mesh.loops[i].vertex_index]
-            uv_data[i].uv = u
-        if len(self.hero.geometry.skin_indices):
-            for n, (bones, weights) in enumerate(zip(self.hero.geometry.skin_indices, self.hero.geometry.skin_weights)):
-                for bone, weight in zip(bones, weights):
-                    if weight != 0:
-                        # if bone in mesh_data['bone_map']:
-                        bone_name = str(bone)  # ['name']
-                        weight_groups[bone_name].add([n], weight, 'REPLACE')
+        if len(geometry.uv):
+            mesh.uv_layers[0].data.foreach_set('uv', loop_buffer(geometry.uv, loop_vertices, 2))
+        if len(geometry.skin_indices):
+            for bone, weight, vertices in weight_batches(geometry.skin_indices, geometry.skin_weights):
+                weight_groups[str(bone)].add(vertices, weight, 'REPLACE')
         self.get_material('WHITE', mesh_obj)
         self.mesh_data = mesh
         self.mesh_obj = mesh_obj
@@ -150,27 +185,15 @@ class HeroIO:
         mesh_obj.select = True
         bpy.context.scene.objects.active = mesh_obj
         self.add_flexes()
-        if self.hero.geometry.vertex_colors:
-            bpy.ops.object.select_all(action="DESELECT")
-            for layer, v_color in self.hero.geometry.vertex_colors.items():
-                self.mesh_obj.select = True
-                bpy.context.scene.objects.active = self.mesh_obj
-                bpy.ops.object.mode_set(mode='VERTEX_PAINT')
-                if layer not in  self.mesh_data.vertex_colors:
-                    self.mesh_data.vertex_colors.new(name=layer)
-                color_layer = self.mesh_data.vertex_colors[layer].data
-                for i in range(len(color_layer)):
-                    u = v_color[self.mesh_data.loops[i].vertex_index]
-                    try:
-                        color_layer[i].color = u
-                    except:
-                        color_layer[i].color = u[:3]
-
-            bpy.ops.object.mode_set(mode='OBJECT')
+        for layer, v_color in geometry.vertex_colors.items():
+            if layer not in self.mesh_data.vertex_colors:
+                self.mesh_data.vertex_colors.new(name=layer)
+            color_layer = self.mesh_data.vertex_colors[layer].data
+            if len(color_layer):
+                # 3 channels before Blender 2.8, RGBA after
+                width = len(color_layer[0].color)
+                color_layer.foreach_set('color', loop_buffer(v_color, loop_vertices, width))
         bpy.ops.object.shade_smooth()
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.remove_doubles(threshold=0.0001)
-        bpy.ops.object.mode_set(mode='OBJECT')
         # mesh.normals_split_custom_set_from_vertices(self.hero.geometry.normals)
         # mesh.normals_split_custom_set(normals)
         mesh.use_auto_smooth = True
@@ -187,14 +210,15 @@ class HeroIO:
 
     def add_flexes(self):
         self.mesh_obj.shape_key_add(name='base')
-        for flex_name, flex_data in self.hero.geometry.shape_key_data.items():
+        vertices = self.mesh_obj.data.vertices
+        base = np.zeros(len(vertices) * 3, dtype=np.float32)
+        vertices.foreach_get('co', base)
+        mixer = ShapeKeyMixer(base.reshape((-1, 3)), self.geometry.shape_key_data)
+        for flex_name, target in zip(mixer.names, mixer.targets):
+            if not target.any():
+                continue
             if not self.mesh_obj.data.shape_keys.key_blocks.get(flex_name):
                 self.mesh_obj.shape_key_add(name=flex_name)
-
-            for vertex_index, flex_vert in enumerate(flex_data):
-                vx = self.mesh_obj.data.vertices[vertex_index].co.x
-                vy = self.mesh_obj.data.vertices[vertex_index].co.y
-                vz = self.mesh_obj.data.vertices[vertex_index].co.z
-                fx, fy, fz = flex_vert
-                self.mesh_obj.data.shape_keys.key_blocks[flex_name].data[vertex_index].co = (
-                    fx + vx, fy + vy, fz + vz)
+            coords = mixer.positions.copy()
+            coords[mixer.active] += target
+            self.mesh_obj.data.shape_keys.key_blocks[flex_name].data.foreach_set('co', coords.ravel())
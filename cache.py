@@ -0,0 +1,309 @@
+"""Caches of parsed HeroForge files.
+
+GeometryCache is a content-addressed on-disk cache, keyed by a hash of the file bytes plus
+PARSER_VERSION. Each entry is one file that is memory-mapped on load, so a warm hit costs a
+hash and a mmap instead of a parse.
+
+HeroFileCache keeps parsed HeroFile objects in memory for long-running services.
+"""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .HeroForge import HeroGeomerty, PARSER_VERSION, output_nbytes, read_hero
+except ImportError:
+    from HeroForge import HeroGeomerty, PARSER_VERSION, output_nbytes, read_hero
+
+MAGIC = b'HFGC'
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_arrays(path, arrays):
+    """Write `arrays` as a JSON header followed by aligned raw buffers. The file appears atomically."""
+    layout = {}
+    contiguous = {}
+    offset = 0
+    for key, array in arrays.items():
+        array = np.asarray(array)
+        array = np.ascontiguousarray(array).reshape(array.shape)  # ascontiguousarray turns 0-d into 1-d
+        if array.dtype.hasobject:
+            raise TypeError('Can not store object array {!r}'.format(key))
+        layout[key] = [array.dtype.str, list(array.shape), offset]
+        contiguous[key] = array
+        offset = _align(offset + array.nbytes)
+    header = json.dumps(layout).encode('utf8')
+    data_start = _align(len(MAGIC) + 4 + len(header))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(MAGIC + struct.pack('<I', len(header)) + header)
+            for key, array in contiguous.items():
+                file.seek(data_start + layout[key][2])
+                file.write(array.tobytes())
+            file.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_arrays(path):
+    """Memory-map a file written by `write_arrays`; returns read-only arrays backed by the mapping."""
+    with open(path, 'rb') as file:
+        magic, header_size = file.read(len(MAGIC)), struct.unpack('<I', file.read(4))[0]
+        if magic != MAGIC:
+            raise ValueError('{} is not a geometry cache entry'.format(path))
+        layout = json.loads(file.read(header_size).decode('utf8'))
+    data_start = _align(len(MAGIC) + 4 + header_size)
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for key, (dtype, shape, offset) in layout.items():
+        dtype = np.dtype(dtype)
+        nbytes = dtype.itemsize * int(np.prod(shape))
+        if nbytes == 0:
+            arrays[key] = np.empty(shape, dtype=dtype)
+        elif data_start + offset + nbytes > len(data):
+            raise ValueError('{} is truncated'.format(path))
+        else:
+            arrays[key] = np.ndarray(shape, dtype=dtype, buffer=data, offset=data_start + offset)
+    return arrays
+
+
+class GeometryCache:
+    """LRU bounded directory of parsed geometries, shared safely between processes.
+
+    Entries are written atomically; a hit refreshes the entry mtime, which is what eviction orders by.
+    """
+    suffix = '.hfc'
+
+    def __init__(self, directory, max_bytes=1024 ** 3):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "<GeometryCache {} {}/{} bytes>".format(self.directory, self.size(), self.max_bytes)
+
+    @staticmethod
+    def key(path):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(b'parser:%d;' % PARSER_VERSION)
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return self.directory / (key + self.suffix)
+
+    def get(self, key):
+        entry = self.entry_path(key)
+        try:
+            arrays = read_arrays(entry)
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError, struct.error):  # corrupt or partially removed entry
+            self._remove(entry)
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return HeroGeomerty.from_arrays(arrays)
+
+    def put(self, key, geometry):
+        write_arrays(self.entry_path(key), geometry.to_arrays())
+        self.evict()
+
+    def load(self, path, **hero_kwargs):
+        """Geometry of the .ckb at `path`, parsed with HeroFile(path, **hero_kwargs) only on a cache miss."""
+        key = self.key(path)
+        geometry = self.get(key)
+        if geometry is not None:
+            self.hits += 1
+            return geometry
+        self.misses += 1
+        hero = read_hero(path, **hero_kwargs)
+        self.put(key, hero.geometry)
+        return hero.geometry
+
+    def entries(self):
+        ret = []
+        for entry in self.directory.glob('*' + self.suffix):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            ret.append((stat.st_mtime, stat.st_size, entry))
+        return sorted(ret)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= budget:
+                break
+            if self._remove(entry):
+                total -= size
+
+    def clear(self):
+        self.evict(0)
+
+    @staticmethod
+    def _remove(entry):
+        try:
+            entry.unlink()
+            return True
+        except OSError:  # already gone, or still mapped on platforms that forbid that
+            return False
+
+
+class HeroFileCache:
+    """Thread-safe in-process LRU of parsed HeroFile objects, bounded by their estimated footprint.
+
+    Entries are keyed by path, mtime and size, so edited files are re-parsed. Cached objects are
+    shared between callers and must be treated as read-only. Lazy entries are re-measured whenever
+    their geometry decodes an attribute; shape key offsets cached later by indexing shape_key_data
+    are not counted, ShapeKeyData.decode keeps them out of the cache instead.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (hero, nbytes)
+        self._by_path = {}
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return "<HeroFileCache {} entries {}/{} bytes>".format(len(self._entries), self.nbytes, self.max_bytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(path, **hero_kwargs):
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size, tuple(sorted(hero_kwargs.items()))
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'nbytes': self.nbytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def get(self, path, **hero_kwargs):
+        """Parsed HeroFile(path, **hero_kwargs), read at most once per file version even under concurrency.
+
+        The same object is returned to every caller. With lazy=True its attributes are decoded on
+        first access under the geometry's lock, so it can be shared across threads, and the entry
+        is re-measured after every such decode so `max_bytes` covers what was decoded since.
+        """
+        key = self.key(path, **hero_kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            pending = self._loading.get(key)
+            if pending is None:
+                pending = self._loading[key] = Future()
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            return pending.result()
+
+        try:
+            hero = read_hero(key[0], **hero_kwargs)
+        except BaseException as ex:
+            with self._lock:
+                del self._loading[key]
+            pending.set_exception(ex)
+            raise
+        if hero.lazy:
+            hero.geometry.observe(lambda geometry: self._update(key, hero, output_nbytes(hero)))
+        self._insert(key, hero, output_nbytes(hero))
+        pending.set_result(hero)
+        return hero
+
+    def _update(self, key, hero, nbytes):
+        """Re-account a cached entry whose lazy attributes were decoded after it was inserted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not hero:
+                return
+            self._entries[key] = (hero, nbytes)
+            self.nbytes += nbytes - entry[1]
+            self._evict()
+
+    def _insert(self, key, hero, nbytes):
+        with self._lock:
+            del self._loading[key]
+            # (path, options) identify the file, mtime and size only its version
+            file_id = (key[0], key[3])
+            stale = self._by_path.pop(file_id, None)
+            if stale in self._entries:
+                self._drop(stale)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (hero, nbytes)
+            self._by_path[file_id] = key
+            self.nbytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.nbytes -= nbytes
+
+    def invalidate(self, path=None):
+        """Forget `path`, or everything when no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._by_path.clear()
+                self.nbytes = 0
+                return
+            path = os.path.realpath(path)
+            for key in [key for key in self._entries if key[0] == path]:
+                self._drop(key)
+
+
+shared_cache = HeroFileCache()
+
+
+def load_cached(path, **hero_kwargs):
+    """Parsed HeroFile for `path` from the process-wide cache."""
+    return shared_cache.get(path, **hero_kwargs)
@@ -0,0 +1,239 @@
+"""SQLite catalog of .ckb metadata for large asset libraries.
+
+    python -m HeroForge_parser.catalog library/ -d library.sqlite -j 8
+
+Files are described in worker processes with a lazy, memory-mapped HeroFile, so mesh, UV, weight
+and shape key arrays are never decoded. The pose stage is, because bone and pose names are
+interleaved with their tracks. A rescan only re-reads files whose mtime or size changed and drops
+rows of files that disappeared. Queries then never touch the .ckb files:
+
+    Catalog('library.sqlite').find(flags=['weights'], min_influences=5, shape_key='smile')
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .HeroForge import HeroFile, ReadStats
+    from .cli import iter_inputs
+except ImportError:
+    from HeroForge import HeroFile, ReadStats
+    from cli import iter_inputs
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    version REAL,
+    export_time REAL,
+    i32_count INTEGER,
+    i16_count INTEGER,
+    i8_count INTEGER,
+    i1_count INTEGER,
+    vertex_count INTEGER,
+    index_count INTEGER,
+    weights_per_vertex INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS flags (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    flag TEXT NOT NULL,
+    PRIMARY KEY (file_id, flag)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS names (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (file_id, kind, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS flags_by_flag ON flags(flag, file_id);
+CREATE INDEX IF NOT EXISTS names_by_name ON names(kind, name, file_id);
+'''
+FILE_COLUMNS = ('version', 'export_time', 'i32_count', 'i16_count', 'i8_count', 'i1_count', 'vertex_count',
+                'index_count', 'weights_per_vertex', 'error')
+# kind stored in the names table -> HeroGeomerty attribute listing them
+NAME_KINDS = {'shape_key': 'shape_key_data', 'bone': 'bones', 'pose': 'poses', 'locator': 'locations'}
+
+
+def describe_file(path):
+    """Metadata of one .ckb as a dict; never raises, a failed parse or stage is returned in 'error'."""
+    entry = {'path': str(path), 'flags': [], 'names': []}
+    stats = ReadStats()
+    try:
+        hero = HeroFile(str(path), lazy=True, mmap=True)
+        hero.read(stats)
+        entry.update(version=hero.version, export_time=hero.export_time, i32_count=hero.i32_count,
+                     i16_count=hero.i16_count, i8_count=hero.i8_count, i1_count=hero.i1_count)
+        entry['flags'] = [name for name, value in hero.options.items() if value]
+        geometry = hero.geometry
+        with warnings.catch_warnings():
+            # a failed pose stage only warns, it is reported through stats instead
+            warnings.simplefilter('ignore')
+            geometry.bones
+        for kind, attribute in NAME_KINDS.items():
+            values = getattr(geometry, attribute)
+            names = values.names if kind == 'bone' else values
+            entry['names'].extend((kind, str(name)) for name in names)
+        entry.update(vertex_count=hero.vertex_count, index_count=hero.index_count,
+                     weights_per_vertex=hero.weights_per_vertex)
+        if stats.errors:
+            entry['error'] = '; '.join('{}: {!r}'.format(stage, ex) for stage, ex in stats.errors.items())
+    except Exception as ex:
+        entry['error'] = repr(ex)
+    return entry
+
+
+class Catalog:
+    """Incrementally updated metadata index over .ckb files."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(SCHEMA)
+
+    def __repr__(self):
+        return "<Catalog {} {} files>".format(self.path, len(self))
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def known(self):
+        """{path: (mtime_ns, size)} of every cataloged file."""
+        return {path: (mtime_ns, size) for path, mtime_ns, size in
+                self.connection.execute('SELECT path, mtime_ns, size FROM files')}
+
+    def scan(self, inputs, jobs=None, prune=True, batch_size=500, progress=None):
+        """Catalog the .ckb files under `inputs` (files, directories or globs) across `jobs` processes.
+
+        Only new files and files whose mtime or size changed are parsed. With `prune`, rows of
+        cataloged files under a scanned directory that no longer exist are removed. `progress`
+        is called with every parsed entry. Returns counts of parsed, unchanged, failed and
+        removed files.
+        """
+        inputs = list(inputs)
+        known = self.known()
+        seen = set()
+        changed = []
+        for path in iter_inputs(inputs):
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            version = (stat.st_mtime_ns, stat.st_size)
+            if known.get(path) != version:
+                changed.append((path, version))
+
+        counts = {'parsed': 0, 'unchanged': len(seen) - len(changed), 'failed': 0, 'removed': 0}
+        if changed:
+            jobs = jobs or os.cpu_count() or 1
+            chunk_size = max(1, min(64, len(changed) // (4 * jobs)))
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                entries = pool.map(describe_file, [path for path, _ in changed], chunksize=chunk_size)
+                batch = []
+                for (_, version), entry in zip(changed, entries):
+                    batch.append((entry, version))
+                    counts['parsed'] += 1
+                    counts['failed'] += 'error' in entry
+                    if progress is not None:
+                        progress(entry)
+                    if len(batch) >= batch_size:
+                        self._store(batch)
+                        batch = []
+                self._store(batch)
+        if prune:
+            roots = [os.path.abspath(item) for item in inputs if os.path.isdir(item)]
+            stale = [path for path in known if path not in seen and
+                     any(path.startswith(os.path.join(root, '')) for root in roots)]
+            counts['removed'] = self.remove(stale)
+        return counts
+
+    def _store(self, batch):
+        with self.connection:
+            for entry, (mtime_ns, size) in batch:
+                self.connection.execute('DELETE FROM files WHERE path = ?', (entry['path'],))
+                cursor = self.connection.execute(
+                    'INSERT INTO files (path, mtime_ns, size, {}) VALUES (?, ?, ?, {})'.format(
+                        ', '.join(FILE_COLUMNS), ', '.join('?' * len(FILE_COLUMNS))),
+                    (entry['path'], mtime_ns, size) + tuple(entry.get(column) for column in FILE_COLUMNS))
+                file_id = cursor.lastrowid
+                self.connection.executemany('INSERT INTO flags VALUES (?, ?)',
+                                            [(file_id, flag) for flag in entry['flags']])
+                self.connection.executemany('INSERT OR IGNORE INTO names VALUES (?, ?, ?)',
+                                            [(file_id, kind, name) for kind, name in entry['names']])
+
+    def remove(self, paths):
+        with self.connection:
+            self.connection.executemany('DELETE FROM files WHERE path = ?', [(path,) for path in paths])
+        return len(paths)
+
+    def find(self, flags=(), min_influences=None, min_vertices=None, max_vertices=None, shape_key=None, bone=None,
+             pose=None, version=None):
+        """Paths of the cataloged files matching every given criterion.
+
+        Names accept SQL LIKE patterns, so shape_key='%smile%' matches any smile morph.
+        """
+        clauses, params = ['error IS NULL'], []
+        for flag in flags:
+            clauses.append('id IN (SELECT file_id FROM flags WHERE flag = ?)')
+            params.append(flag)
+        for column, operator, value in (('weights_per_vertex', '>=', min_influences),
+                                        ('vertex_count', '>=', min_vertices), ('vertex_count', '<=', max_vertices),
+                                        ('version', '=', version)):
+            if value is not None:
+                clauses.append('{} {} ?'.format(column, operator))
+                params.append(value)
+        for kind, pattern in (('shape_key', shape_key), ('bone', bone), ('pose', pose)):
+            if pattern is not None:
+                clauses.append('id IN (SELECT file_id FROM names WHERE kind = ? AND name LIKE ?)')
+                params.extend((kind, pattern))
+        query = 'SELECT path FROM files WHERE {} ORDER BY path'.format(' AND '.join(clauses))
+        return [path for path, in self.connection.execute(query, params)]
+
+    def names(self, path, kind=None):
+        """Names recorded for `path`, of one `kind` ('shape_key', 'bone', 'pose' or 'locator') or all."""
+        query = 'SELECT kind, name FROM names JOIN files ON files.id = names.file_id WHERE path = ?'
+        params = [os.path.abspath(path)]
+        if kind is not None:
+            query += ' AND kind = ?'
+            params.append(kind)
+        return [name if kind else (row_kind, name) for row_kind, name in self.connection.execute(query, params)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or update a SQLite catalog of HeroForge .ckb files')
+    parser.add_argument('inputs', nargs='+', help='.ckb files, directories or glob patterns')
+    parser.add_argument('-d', '--database', required=True, help='catalog file, created if missing')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--keep-missing', action='store_true', help='keep rows of files that no longer exist')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with Catalog(args.database) as catalog:
+        counts = catalog.scan(args.inputs, args.jobs, prune=not args.keep_missing)
+        total = len(catalog)
+    print('Parsed {parsed}, unchanged {unchanged}, failed {failed}, removed {removed}'.format(**counts),
+          '- {} files cataloged in {:.1f}s'.format(total, time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
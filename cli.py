@@ -0,0 +1,129 @@
+"""Headless batch converter: parses .ckb files in a process pool and writes one .npz per asset.
+
+    python -m HeroForge_parser.cli models/ extra/*.ckb -o converted/ -j 8
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .HeroForge import HeroFile
+except ImportError:
+    from HeroForge import HeroFile
+
+
+def iter_inputs(inputs, pattern='*.ckb'):
+    """Yield .ckb paths from files, directories (searched recursively) and glob patterns, without listing them all."""
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            yield from path.rglob(pattern)
+        elif path.is_file():
+            yield path
+        else:
+            for match in glob.iglob(item, recursive=True):
+                if Path(match).is_file():
+                    yield Path(match)
+
+
+def output_path(path, output_dir):
+    return Path(output_dir) / (Path(path).stem + '.npz')
+
+
+def convert_file(path, output_dir, use_mmap=True, compress=True):
+    """Parse one file and write its arrays; never raises, failures are returned in the report entry."""
+    start = time.perf_counter()
+    entry = {'path': str(path), 'output': str(output_path(path, output_dir))}
+    try:
+        hero = HeroFile(str(path), mmap=use_mmap)
+        hero.read()
+        arrays = hero.geometry.to_arrays()
+        arrays['version'] = np.asarray(hero.version, dtype=np.float32)
+        (np.savez_compressed if compress else np.savez)(entry['output'], **arrays)
+        entry['vertices'] = hero.vertex_count
+        entry['ok'] = True
+    except Exception as ex:
+        entry['ok'] = False
+        entry['error'] = repr(ex)
+        entry['traceback'] = traceback.format_exc()
+    entry['seconds'] = time.perf_counter() - start
+    return entry
+
+
+def convert(paths, output_dir, jobs=None, use_mmap=True, compress=True, skip_existing=False):
+    """Convert `paths` across `jobs` worker processes, yielding report entries as files finish.
+
+    At most 2 * jobs files are in flight at any time, so memory stays flat for any batch size.
+    A file whose output name was already taken by an earlier file of the batch is reported as
+    failed instead of overwriting it.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    claimed = {}  # output path -> input path that writes it
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        in_flight = set()
+        for path in paths:
+            output = output_path(path, output_dir)
+            owner = claimed.setdefault(os.path.normcase(os.path.abspath(output)), str(path))
+            if owner != str(path):
+                yield {'path': str(path), 'output': str(output), 'ok': False, 'seconds': 0.0,
+                       'error': 'output {} is already written by {}'.format(output, owner)}
+                continue
+            if skip_existing and output.exists():
+                continue
+            in_flight.add(pool.submit(convert_file, path, output_dir, use_mmap, compress))
+            if len(in_flight) >= 2 * jobs:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in in_flight:
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert HeroForge .ckb files to .npz archives')
+    parser.add_argument('inputs', nargs='+', help='.ckb files, directories or glob patterns')
+    parser.add_argument('-o', '--output', required=True, help='output directory')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--report', help='write a JSON line per failed file here')
+    parser.add_argument('--skip-existing', action='store_true', help='skip files whose .npz already exists')
+    parser.add_argument('--no-mmap', action='store_true', help='read input files into memory instead of mapping')
+    parser.add_argument('--no-compress', action='store_true', help='write uncompressed .npz files')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only print the summary')
+    args = parser.parse_args(argv)
+
+    done = failed = 0
+    start = time.perf_counter()
+    report = open(args.report, 'w') if args.report else None
+    try:
+        entries = convert(iter_inputs(args.inputs), args.output, args.jobs, not args.no_mmap, not args.no_compress,
+                          args.skip_existing)
+        for entry in entries:
+            done += 1
+            if not entry['ok']:
+                failed += 1
+                if report:
+                    report.write(json.dumps(entry) + '\n')
+                    report.flush()
+            if not args.quiet or not entry['ok']:
+                status = 'ok' if entry['ok'] else 'FAILED: ' + entry['error']
+                print('[{}] {} {} ({:.0f} ms)'.format(done, entry['path'], status, entry['seconds'] * 1000),
+                      file=sys.stderr)
+    finally:
+        if report:
+            report.close()
+    print('Converted {} of {} files in {:.1f}s, {} failed'.format(done - failed, done, time.perf_counter() - start,
+                                                                 failed), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
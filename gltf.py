@@ -0,0 +1,227 @@
+"""Binary glTF 2.0 (.glb) export straight from decoded HeroForge arrays.
+
+Every buffer view is written from a NumPy array with a single tobytes() call. With streaming=True,
+derived arrays (normalized normals, flipped UVs and shape key targets) are produced one at a time
+while the binary chunk is written instead of being built up front, so peak memory stays near the
+decoded file plus the largest single target.
+"""
+import json
+import struct
+
+import numpy as np
+
+try:
+    from .animation import CHANNELS, clip_key_times, normalize
+    from .skinning import influences, skeleton_world_matrices
+except ImportError:
+    from animation import CHANNELS, clip_key_times, normalize
+    from skinning import influences, skeleton_world_matrices
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+COMPONENT_TYPES = {np.dtype(np.int8): 5120, np.dtype(np.uint8): 5121, np.dtype(np.int16): 5122,
+                   np.dtype(np.uint16): 5123, np.dtype(np.uint32): 5125, np.dtype(np.float32): 5126}
+ACCESSOR_TYPES = {1: 'SCALAR', 2: 'VEC2', 3: 'VEC3', 4: 'VEC4', 16: 'MAT4'}
+GLTF_CHANNELS = {'pos': 'translation', 'rot': 'rotation', 'scl': 'scale'}
+
+
+class GlbBuilder:
+    """Collects accessors and their buffer views and writes them out as one .glb file."""
+
+    def __init__(self, streaming=False):
+        self.streaming = streaming
+        self.gltf = {'asset': {'version': '2.0', 'generator': 'HeroForge_parser'}, 'scenes': [{'nodes': []}],
+                     'scene': 0, 'nodes': [], 'accessors': [], 'bufferViews': [], 'buffers': [{'byteLength': 0}]}
+        self._views = []  # (array or producer, dtype, byte length)
+        self._length = 0
+
+    def add_accessor(self, data, width, dtype=np.float32, target=None, bounds=False, count=None):
+        """Add an accessor of `width` components per element and return its index, or None for empty data.
+
+        `data` is an array or a callable returning one. When streaming, callables are only evaluated
+        while writing (and once up front for `bounds`), so they must be given the element `count`
+        unless `bounds` is set.
+        """
+        dtype = np.dtype(dtype)
+        if callable(data) and not self.streaming:
+            data = data()
+        array = None
+        if not callable(data):
+            array = data = np.ascontiguousarray(data, dtype=dtype).reshape((-1, width))
+        elif bounds:
+            array = np.asarray(data(), dtype=dtype).reshape((-1, width))
+        if array is not None:
+            count = len(array)
+        elif count is None:
+            raise ValueError('Streamed accessors need a count or bounds')
+        if count == 0:
+            return None
+
+        byte_length = count * width * dtype.itemsize
+        view = {'buffer': 0, 'byteOffset': self._length, 'byteLength': byte_length}
+        if target is not None:
+            view['target'] = target
+        self.gltf['bufferViews'].append(view)
+        self._views.append((data, dtype, byte_length))
+        self._length += -(-byte_length // 4) * 4
+
+        accessor = {'bufferView': len(self.gltf['bufferViews']) - 1, 'componentType': COMPONENT_TYPES[dtype],
+                    'count': count, 'type': ACCESSOR_TYPES[width]}
+        if bounds:
+            accessor['min'] = array.min(axis=0).tolist()
+            accessor['max'] = array.max(axis=0).tolist()
+        self.gltf['accessors'].append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+    def add_node(self, node, root=True):
+        self.gltf['nodes'].append(node)
+        if root:
+            self.gltf['scenes'][0]['nodes'].append(len(self.gltf['nodes']) - 1)
+        return len(self.gltf['nodes']) - 1
+
+    def write(self, path):
+        self.gltf['buffers'][0]['byteLength'] = self._length
+        gltf = {key: value for key, value in self.gltf.items() if value != []}
+        header = json.dumps(gltf, separators=(',', ':')).encode('utf8')
+        header += b' ' * (-len(header) % 4)
+        total = 12 + 8 + len(header) + 8 + self._length
+        with open(path, 'wb') as file:
+            file.write(struct.pack('<4sII', b'glTF', 2, total))
+            file.write(struct.pack('<I4s', len(header), b'JSON') + header)
+            file.write(struct.pack('<I4s', self._length, b'BIN\x00'))
+            for data, dtype, byte_length in self._views:
+                array = data() if callable(data) else data
+                file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+                file.write(b'\x00' * (-byte_length % 4))
+        return total
+
+
+def _skin_arrays(geometry, bone_count):
+    indices, weights = influences(geometry)
+    valid = (indices >= 0) & (indices < bone_count)
+    weights = np.where(valid, weights, 0)
+    indices = np.where(valid, indices, 0)
+    unweighted = weights.sum(axis=1) == 0
+    weights[unweighted, 0] = 1
+    pad = -indices.shape[1] % 4
+    indices = np.pad(indices, ((0, 0), (0, pad))).astype(np.uint16)
+    weights = np.pad(weights, ((0, 0), (0, pad))).astype(np.float32)
+    return indices, weights
+
+
+def _add_mesh(builder, geometry, skin):
+    attributes = {'POSITION': builder.add_accessor(geometry.positions, 3, target=ARRAY_BUFFER, bounds=True)}
+    if len(geometry.normals):
+        attributes['NORMAL'] = builder.add_accessor(lambda: normalize(np.asarray(geometry.normals, np.float32)), 3,
+                                                    target=ARRAY_BUFFER, count=len(geometry.normals))
+    for n, uv in enumerate((geometry.uv, geometry.uv2)):
+        if len(uv):
+            # glTF puts the UV origin at the top left
+            attributes['TEXCOORD_{}'.format(n)] = builder.add_accessor(
+                lambda uv=uv: np.asarray(uv, np.float32) * [1, -1] + [0, 1], 2, target=ARRAY_BUFFER, count=len(uv))
+    layer_names = list(geometry.vertex_colors)
+    for n, layer_name in enumerate(layer_names):
+        attributes['COLOR_{}'.format(n)] = builder.add_accessor(geometry.vertex_colors[layer_name], 4,
+                                                                target=ARRAY_BUFFER)
+    if skin is not None:
+        joints, weights = skin
+        for n in range(joints.shape[1] // 4):
+            attributes['JOINTS_{}'.format(n)] = builder.add_accessor(joints[:, 4 * n:4 * n + 4], 4, np.uint16,
+                                                                     target=ARRAY_BUFFER)
+            attributes['WEIGHTS_{}'.format(n)] = builder.add_accessor(weights[:, 4 * n:4 * n + 4], 4,
+                                                                      target=ARRAY_BUFFER)
+    primitive = {'attributes': {key: value for key, value in attributes.items() if value is not None}, 'mode': 4}
+    index = np.asarray(geometry.index)
+    if index.size:
+        primitive['indices'] = builder.add_accessor(index.ravel(), 1, np.uint32 if index.max() > 0xFFFF else np.uint16,
+                                                    target=ELEMENT_ARRAY_BUFFER)
+    mesh = {'primitives': [primitive]}
+    if layer_names:
+        primitive['extras'] = {'colorLayers': layer_names}
+
+    shape_key_data = geometry.shape_key_data
+    target_names = list(shape_key_data)
+    if target_names:
+        decode = getattr(shape_key_data, 'decode', shape_key_data.__getitem__)
+        primitive['targets'] = [
+            {'POSITION': builder.add_accessor(lambda name=name: decode(name), 3, bounds=True)}
+            for name in target_names]
+        mesh['weights'] = [0.0] * len(target_names)
+        mesh['extras'] = {'targetNames': target_names}
+    builder.gltf['meshes'] = [mesh]
+
+
+def _add_skeleton(builder, skeleton):
+    first = len(builder.gltf['nodes'])
+    children = {}
+    for bone_id, parent_id in enumerate(skeleton.parent_ids.tolist()):
+        if 0 <= parent_id < len(skeleton) and parent_id != bone_id:
+            children.setdefault(parent_id, []).append(first + bone_id)
+    for bone_id, bone in enumerate(skeleton):
+        node = {'name': bone.name, 'translation': bone.pos.tolist(),
+                'rotation': normalize(bone.quat).tolist(), 'scale': bone.scale.tolist()}
+        if bone_id in children:
+            node['children'] = children[bone_id]
+        is_root = bone_id not in {child - first for nodes in children.values() for child in nodes}
+        builder.add_node(node, root=is_root)
+    return list(range(first, first + len(skeleton)))
+
+
+def _add_animations(builder, poses, skeleton, joints, fps):
+    animations = []
+    constant_time = None
+    for clip_name, tracks in poses.items():
+        key_times = clip_key_times(tracks) / np.float32(fps)
+        key_times -= key_times[0]
+        times = builder.add_accessor(key_times, 1, bounds=True)
+        samplers, channels = [], []
+        for bone_name, track in tracks.items():
+            if bone_name not in skeleton.names:
+                continue
+            node = joints[skeleton.index(bone_name)]
+            for name, width in CHANNELS:
+                values = np.asarray(track[name], dtype=np.float32).reshape((-1, width))[:len(key_times)]
+                if len(values) == 1:
+                    if constant_time is None:
+                        constant_time = builder.add_accessor(np.zeros(1, np.float32), 1, bounds=True)
+                    sampler_input = constant_time
+                else:
+                    sampler_input = times
+                if name == 'rot':
+                    values = normalize(values)
+                samplers.append({'input': sampler_input, 'output': builder.add_accessor(values, width),
+                                 'interpolation': 'LINEAR'})
+                channels.append({'sampler': len(samplers) - 1, 'target': {'node': node, 'path': GLTF_CHANNELS[name]}})
+        if channels:
+            animations.append({'name': clip_name, 'samplers': samplers, 'channels': channels})
+    if animations:
+        builder.gltf['animations'] = animations
+
+
+def export_glb(source, path, name=None, fps=30.0, streaming=False):
+    """Write a HeroFile or HeroGeomerty to `path` as binary glTF; returns the file size in bytes.
+
+    Pose clip frames are converted to seconds with `fps`.
+    """
+    geometry = getattr(source, 'geometry', source)
+    name = name or getattr(source, 'name', 'HeroForge')
+    builder = GlbBuilder(streaming)
+    skeleton = geometry.bones
+    joints = _add_skeleton(builder, skeleton) if len(skeleton) else []
+
+    if geometry.has_geometry and len(geometry.positions):
+        skin = None
+        if joints and np.asarray(geometry.skin_indices).size:
+            skin = _skin_arrays(geometry, len(joints))
+        _add_mesh(builder, geometry, skin)
+        mesh_node = {'name': name, 'mesh': 0}
+        if skin is not None:
+            inverse_bind = np.linalg.inv(skeleton_world_matrices(skeleton))
+            builder.gltf['skins'] = [{'joints': joints, 'inverseBindMatrices': builder.add_accessor(
+                inverse_bind.transpose(0, 2, 1).reshape((-1, 16)), 16)}]  # glTF matrices are column-major
+            mesh_node['skin'] = 0
+        builder.add_node(mesh_node)
+
+    if joints and geometry.poses:
+        _add_animations(builder, geometry.poses, skeleton, joints, fps)
+    return builder.write(path)
@@ -0,0 +1,76 @@
+"""Batched shape key mixing.
+
+Targets are stacked into one (K, A, 3) matrix over the A vertices that at least one target moves,
+so a batch of M weight vectors costs a single (M, K) x (K, A*3) product.
+"""
+import numpy as np
+
+
+class ShapeKeyMixer:
+    """Deforms base positions by weighted sums of shape key offsets.
+
+    `tolerance` decides which offsets count as movement. The default, None, uses half of each
+    target's quantization step, which is the closest a stored offset can get to zero.
+    """
+
+    def __init__(self, positions, shape_key_data, names=None, tolerance=None):
+        self.positions = np.asarray(positions, dtype=np.float32)
+        self.names = list(shape_key_data) if names is None else list(names)
+        vertex_count = len(self.positions)
+        moved = np.zeros(vertex_count, dtype=bool)
+        offsets = []
+        for name in self.names:
+            target = np.asarray(shape_key_data[name], dtype=np.float32).reshape((vertex_count, 3))
+            if tolerance is None and hasattr(shape_key_data, 'bounds'):
+                low, high = shape_key_data.bounds(name)
+                threshold = (np.asarray(high, dtype=np.float32) - np.asarray(low, dtype=np.float32)) / 255 / 2
+            else:
+                threshold = np.float32(tolerance or 0)
+            target = np.where(np.abs(target) > threshold, target, 0)
+            moved |= target.any(axis=1)
+            offsets.append(target)
+        self.active = np.nonzero(moved)[0]
+        self.targets = np.stack([target[self.active] for target in offsets]) if offsets else \
+            np.zeros((0, 0, 3), dtype=np.float32)
+
+    @classmethod
+    def from_geometry(cls, geometry, names=None, tolerance=None):
+        return cls(geometry.positions, geometry.shape_key_data, names, tolerance)
+
+    def __repr__(self):
+        return "<ShapeKeyMixer {} keys {}/{} active vertices>".format(len(self.names), len(self.active),
+                                                                       len(self.positions))
+
+    def weights(self, values):
+        """Weight vector in key order from a {name: weight} dict; unknown names raise KeyError."""
+        vector = np.zeros(len(self.names), dtype=np.float32)
+        index = {name: n for n, name in enumerate(self.names)}
+        for name, value in values.items():
+            vector[index[name]] = value
+        return vector
+
+    def _batch(self, weights):
+        # explicit batch size, reshape can not infer -1 when there are no keys
+        weights = np.asarray(weights, dtype=np.float32)
+        return weights.reshape((len(weights) if weights.ndim > 1 else 1, len(self.names)))
+
+    def offsets(self, weights):
+        """(M, A, 3) summed offsets of the active vertices for (M, K) weights."""
+        weights = self._batch(weights)
+        flat = self.targets.reshape((len(self.names), len(self.active) * 3))
+        return (weights @ flat).reshape((len(weights), len(self.active), 3))
+
+    def evaluate(self, weights):
+        """Deformed positions: (N, 3) for one (K,) weight vector, (M, N, 3) for (M, K) weights."""
+        single = np.ndim(weights) == 1
+        batch = self._batch(weights)
+        deformed = np.repeat(self.positions[None], len(batch), axis=0)
+        if self.names:
+            deformed[:, self.active] += self.offsets(batch)
+        return deformed[0] if single else deformed
+
+    def target(self, name):
+        """Dense (N, 3) offsets of one key after applying the tolerance."""
+        dense = np.zeros_like(self.positions)
+        dense[self.active] = self.targets[self.names.index(name)]
+        return dense
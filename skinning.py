@@ -0,0 +1,120 @@
+"""Forward kinematics and linear blend skinning on decoded geometry, without Blender.
+
+Bone transforms are local to the parent bone, quaternions are (x, y, z, w). Every function
+accepts an optional leading batch axis of poses.
+"""
+import numpy as np
+
+
+def quaternion_matrices(quaternions):
+    """(..., 4) (x, y, z, w) quaternions to (..., 3, 3) rotation matrices; input need not be normalized."""
+    q = np.asarray(quaternions, dtype=np.float32)
+    norm = np.linalg.norm(q, axis=-1, keepdims=True)
+    x, y, z, w = np.moveaxis(q / np.where(norm == 0, 1, norm), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=-1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=-1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def compose_matrices(positions, quaternions, scales):
+    """(..., 4, 4) matrices of translation * rotation * scale."""
+    positions = np.asarray(positions, dtype=np.float32)
+    matrices = np.zeros(positions.shape[:-1] + (4, 4), dtype=np.float32)
+    matrices[..., :3, :3] = quaternion_matrices(quaternions) * np.asarray(scales, dtype=np.float32)[..., None, :]
+    matrices[..., :3, 3] = positions
+    matrices[..., 3, 3] = 1
+    return matrices
+
+
+def bone_levels(parent_ids):
+    """Depth of every bone in the hierarchy; bones with a missing or out of range parent are roots."""
+    parent_ids = np.asarray(parent_ids, dtype=np.int64)
+    count = len(parent_ids)
+    is_root = (parent_ids < 0) | (parent_ids >= count)
+    levels = np.where(is_root, 0, -1)
+    parents = np.where(is_root, 0, parent_ids)
+    for level in range(1, count + 1):
+        pending = levels < 0
+        if not pending.any():
+            break
+        ready = pending & (levels[parents] == level - 1)
+        if not ready.any():
+            raise ValueError('Bone hierarchy contains a cycle')
+        levels[ready] = level
+    return levels
+
+
+def world_matrices(parent_ids, local_matrices):
+    """Accumulate (..., B, 4, 4) local matrices into world matrices, one batched product per hierarchy level."""
+    parent_ids = np.asarray(parent_ids, dtype=np.int64)
+    levels = bone_levels(parent_ids)
+    world = np.array(local_matrices, dtype=np.float32)
+    for level in range(1, int(levels.max(initial=0)) + 1):
+        bones = np.nonzero(levels == level)[0]
+        world[..., bones, :, :] = world[..., parent_ids[bones], :, :] @ world[..., bones, :, :]
+    return world
+
+
+def skeleton_world_matrices(skeleton, pose=None):
+    """World matrices of `skeleton` at rest, or for a sampled pose dict of (T,B,...) 'pos'/'rot'/'scl' arrays."""
+    if pose is None:
+        local = compose_matrices(skeleton.positions, skeleton.quaternions, skeleton.scales)
+    else:
+        local = compose_matrices(pose['pos'], pose['rot'], pose['scl'])
+    return world_matrices(skeleton.parent_ids, local)
+
+
+def skinning_matrices(skeleton, pose=None):
+    """(..., B, 4, 4) matrices taking rest-pose vertices to `pose`."""
+    rest = skeleton_world_matrices(skeleton)
+    posed = rest if pose is None else skeleton_world_matrices(skeleton, pose)
+    return posed @ np.linalg.inv(rest)
+
+
+def influences(geometry):
+    """(N, I) bone indices and normalized weights, including influences beyond the first four."""
+    indices = np.asarray(geometry.skin_indices, dtype=np.int64)
+    weights = np.asarray(geometry.skin_weights, dtype=np.float32)
+    additional = np.asarray(geometry.additional_skin_weights)
+    if additional.size:
+        indices = np.concatenate([indices, np.asarray(geometry.additional_skin_indices, dtype=np.int64)], axis=1)
+        weights = np.concatenate([weights, additional.astype(np.float32)], axis=1)
+    total = weights.sum(axis=1, keepdims=True)
+    return indices, weights / np.where(total == 0, 1, total)
+
+
+def linear_blend_skin(positions, normals, indices, weights, matrices):
+    """Skin (N,3) positions and normals with (..., B, 4, 4) matrices; returns (..., N, 3) arrays.
+
+    Vertices without weights, or whose bones are out of range, keep their rest position.
+    """
+    matrices = np.asarray(matrices, dtype=np.float32)
+    bone_count = matrices.shape[-3]
+    valid = (indices >= 0) & (indices < bone_count)
+    weights = np.where(valid, weights, 0)
+    indices = np.where(valid, indices, 0)
+
+    blended = np.zeros(matrices.shape[:-3] + (len(indices), 3, 4), dtype=np.float32)
+    for influence in range(indices.shape[1]):
+        blended += weights[:, influence, None, None] * matrices[..., indices[:, influence], :3, :]
+    unweighted = weights.sum(axis=1) == 0
+    blended[..., unweighted, :, :] = np.eye(3, 4, dtype=np.float32)
+
+    positions = np.asarray(positions, dtype=np.float32)
+    skinned_positions = np.einsum('...nij,nj->...ni', blended[..., :3], positions) + blended[..., 3]
+    skinned_normals = None
+    if normals is not None and len(normals):
+        skinned_normals = np.einsum('...nij,nj->...ni', blended[..., :3], np.asarray(normals, dtype=np.float32))
+        length = np.linalg.norm(skinned_normals, axis=-1, keepdims=True)
+        skinned_normals /= np.where(length == 0, 1, length)
+    return skinned_positions, skinned_normals
+
+
+def skin_geometry(geometry, pose=None):
+    """Posed 'positions' and 'normals' of a decoded HeroGeomerty for a sampled pose (or a batch of poses)."""
+    indices, weights = influences(geometry)
+    positions, normals = linear_blend_skin(geometry.positions, geometry.normals, indices, weights,
+                                           skinning_matrices(geometry.bones, pose))
+    return {'positions': positions, 'normals': normals}
@@ -0,0 +1,184 @@
+"""Synthetic .ckb files for benchmarks and parser experiments.
+
+The files follow the layout HeroFile.read expects for every version branch, with random but valid
+content. Any settings flag of the version can be switched on or off, the defaults enable every
+stage the parser decodes.
+
+    write_ckb('big.ckb', version=1.4, vertex_count=200000, shape_keys=40, bones=120, frames=60)
+"""
+import itertools
+
+import numpy as np
+
+try:
+    from .ByteIO import ByteIO
+    from .HeroForge import settings_layout
+except ImportError:
+    from ByteIO import ByteIO
+    from HeroForge import settings_layout
+
+VERSIONS = (1.1, 1.2, 1.25, 1.4)
+DEFAULT_FLAGS = {'mesh': True, 'normals': True, 'uv1': True, 'uv2': True, 'blendTargets': True,
+                 'blendNormals': True, 'weights': True, 'animations': True, 'jointScales': True,
+                 'frameMappings': True, 'originalIndices': True, 'vertexColors': True}
+
+
+class SectionWriter:
+    """Collects the float32, uint16, uint8 and bit sections of a .ckb in decoding order."""
+
+    def __init__(self):
+        self.sections = ([], [], [], [])
+
+    def i32(self, values):
+        self.sections[0].append(np.asarray(values, dtype=np.float32).ravel())
+
+    def i16(self, values):
+        self.sections[1].append(np.asarray(values, dtype=np.uint16).ravel())
+
+    def i8(self, values):
+        self.sections[2].append(np.asarray(values, dtype=np.uint8).ravel())
+
+    def i1(self, values):
+        self.sections[3].append(np.asarray(values, dtype=bool).ravel())
+
+    def string(self, value):
+        data = value.encode('latin-1')
+        self.i8([len(data)])
+        self.i8(np.frombuffer(data, dtype=np.uint8))
+
+    def write(self, path, version, export_time=0.0):
+        i32, i16, i8, i1 = (np.concatenate(section) if section else np.zeros(0, dtype=dtype)
+                            for section, dtype in zip(self.sections, (np.float32, np.uint16, np.uint8, bool)))
+        writer = ByteIO(path=path, mode='w')
+        try:
+            writer.write_float(version)
+            for count in (len(i32), len(i16), len(i8), len(i1)):
+                writer.write_float(count)
+            if version >= 1.4:
+                writer.write_float(export_time)
+            writer.write_array(i32, '<f4')
+            writer.write_array(i16, '<u2')
+            writer.write_array(i8, np.uint8)
+            writer.write_array(np.packbits(i1, bitorder='little'), np.uint8)
+        finally:
+            writer.close()
+
+
+def settings_flags(version):
+    """Every settings flag stored by `version`."""
+    return settings_layout(version)[0]
+
+
+def flag_combinations(version, names=None):
+    """Yield every on/off combination of `names` (all flags of `version` by default) as a flags dict."""
+    names = settings_flags(version) if names is None else list(names)
+    for values in itertools.product((False, True), repeat=len(names)):
+        yield dict(zip(names, values))
+
+
+def _write_transforms(sections, rng, frame_count, joint_scales):
+    """One bone of a pose group: position, rotation and scale channels, each constant or animated."""
+    for width in (3, 4):
+        constant = bool(rng.integers(2))
+        sections.i1([constant])
+        sections.i16(rng.integers(0, 65536, width * (1 if constant else frame_count)))
+    constant = bool(rng.integers(2))
+    sections.i1([constant])
+    if constant or joint_scales:
+        sections.i16(rng.integers(0, 65536, 3 * (1 if constant else frame_count)))
+
+
+def write_ckb(path, version=1.4, vertex_count=1000, triangle_count=None, shape_keys=4, bones=16, frames=30,
+              poses=1, locators=0, weights_per_vertex=4, vertex_color_layers=2, seed=0, export_time=0.0,
+              rest_frames=1, **flags):
+    """Write a random .ckb to `path` and return the settings flags used.
+
+    `rest_frames` is the frame count stored for the rest skeleton; 0 leaves its animated channels empty.
+    `flags` override DEFAULT_FLAGS; flags that `version` does not store raise ValueError.
+    """
+    names = settings_flags(version)
+    unknown = set(flags) - set(names)
+    if unknown:
+        raise ValueError('Version {} does not store {}'.format(version, ', '.join(sorted(unknown))))
+    options = dict.fromkeys(names, False)
+    options.update(DEFAULT_FLAGS)
+    options.update(flags)
+    if options['mesh'] and not options['indices32bit'] and vertex_count > 0xFFFF:
+        raise ValueError('{} vertices need indices32bit'.format(vertex_count))
+    if triangle_count is None:
+        triangle_count = 2 * vertex_count
+    rng = np.random.default_rng(seed)
+    sections = SectionWriter()
+
+    _, padding = settings_layout(version)
+    sections.i1([options[name] for name in names] + [False] * padding)
+    if options['mesh']:
+        index_section = sections.i32 if options['indices32bit'] else sections.i16
+        sections.i32([3 * triangle_count])
+        index_section(rng.integers(0, vertex_count, 3 * triangle_count))
+        if options['originalIndices']:
+            index_section(rng.integers(0, vertex_count, 3 * triangle_count))
+        index_section([vertex_count])
+        sections.i32([-1, -1, -1, 1, 1, 1])
+        sections.i16(rng.integers(0, 65536, 3 * vertex_count))
+    else:
+        vertex_count = 0
+    if options['normals'] and vertex_count:
+        sections.i8(rng.integers(0, 256, 2 * vertex_count))
+        sections.i1(rng.integers(0, 2, vertex_count))
+    if options['uv1']:
+        for _ in range(2 if options['uv2'] else 1):
+            sections.i32([0, 0, 1, 1])
+            sections.i16(rng.integers(0, 65536, 2 * vertex_count))
+    if options['vertexColors']:
+        sections.i8([vertex_color_layers])
+        for layer in range(vertex_color_layers):
+            sections.string('layer{}'.format(layer))
+            sections.i8(rng.integers(0, 256, vertex_count))
+    if options['blendTargets']:
+        sections.i8([shape_keys])
+        for key in range(shape_keys):
+            sections.string('key{}'.format(key))
+            sections.i32([-0.1, -0.1, -0.1, 0.1, 0.1, 0.1])
+            sections.i8(rng.integers(0, 256, 3 * vertex_count))
+            if options['blendNormals']:
+                sections.i8(rng.integers(0, 256, 2 * vertex_count))
+                sections.i1(rng.integers(0, 2, vertex_count))
+    if options['weights']:
+        sections.i8([weights_per_vertex])
+        sections.i16(rng.integers(0, max(bones, 1), weights_per_vertex * vertex_count))
+        sections.i16(rng.integers(0, 65536, weights_per_vertex * vertex_count))
+    if options['singleParent']:
+        sections.string('parent')
+        sections.i16([rng.integers(0, max(bones, 1))])
+    if options['animations']:
+        joint_scales = options['jointScales']
+        sections.i8([(1 if bones else 0) + poses + (1 if locators else 0)])
+        if options['frameMappings']:
+            sections.i16([frames])
+            sections.i16(np.arange(frames))
+        sections.i32([2.0])
+        if joint_scales:
+            sections.i32([1.5])
+        if bones:
+            sections.string('main')
+            sections.i16([bones, rest_frames])
+            for bone in range(bones):
+                sections.i16([5000 if bone == 0 else rng.integers(0, bone)])
+                sections.string('bone{}'.format(bone))
+                _write_transforms(sections, rng, rest_frames, joint_scales)
+        for pose in range(poses):
+            sections.string('pose{}'.format(pose))
+            sections.i16([bones, frames])
+            for bone in range(bones):
+                sections.string('bone{}'.format(bone))
+                _write_transforms(sections, rng, frames, joint_scales)
+        if locators:
+            sections.string('locators')
+            sections.i16([locators, 1])
+            for locator in range(locators):
+                sections.string('locator{}'.format(locator))
+                _write_transforms(sections, rng, 1, joint_scales)
+
+    sections.write(path, version, export_time)
+    return options
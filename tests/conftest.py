@@ -0,0 +1,51 @@
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+import stub_bpy
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGE = 'HeroForge_parser'
+
+
+def _load_package():
+    """Import the addon directory as a package, so its relative imports resolve without Blender."""
+    if PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(PACKAGE, ROOT / '__init__.py',
+                                                      submodule_search_locations=[str(ROOT)])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE] = module
+        spec.loader.exec_module(module)
+    return sys.modules[PACKAGE]
+
+
+_load_package()
+
+
+@pytest.fixture
+def package():
+    for name in ('HeroForge', 'synthetic'):
+        importlib.import_module('{}.{}'.format(PACKAGE, name))
+    return sys.modules[PACKAGE]
+
+
+@pytest.fixture
+def part_path(package, tmp_path):
+    """A skinned, morphed and animated synthetic .ckb of 300 vertices."""
+    path = tmp_path / 'part.ckb'
+    package.synthetic.write_ckb(str(path), vertex_count=300, shape_keys=2, bones=8, frames=5)
+    return str(path)
+
+
+@pytest.fixture
+def bl_loader(monkeypatch):
+    """bl_loader bound to a fresh stub bpy for every test."""
+    bpy = stub_bpy.make_bpy()
+    monkeypatch.setitem(sys.modules, 'bpy', bpy)
+    monkeypatch.setitem(sys.modules, 'mathutils', stub_bpy.make_mathutils())
+    module = importlib.import_module(PACKAGE + '.bl_loader')
+    monkeypatch.setattr(module, 'bpy', bpy)
+    return module
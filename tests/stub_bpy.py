@@ -0,0 +1,167 @@
+"""Minimal stand-ins for the parts of bpy and mathutils that bl_loader uses, for headless tests.
+
+Collections keep their properties as NumPy arrays and check foreach_set sizes like Blender does.
+Mesh.update only derives edges with calc_edges=True, as Blender does for meshes built through
+foreach_set.
+"""
+import types
+
+import numpy as np
+
+
+class PropertyCollection:
+    def __init__(self, widths, count=0):
+        self.widths = widths
+        self.arrays = {name: np.zeros((count, width), dtype=np.float64) for name, width in widths.items()}
+
+    def __len__(self):
+        return len(next(iter(self.arrays.values())))
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return types.SimpleNamespace(**{name: array[index].tolist() for name, array in self.arrays.items()})
+
+    def add(self, count):
+        for name, array in self.arrays.items():
+            self.arrays[name] = np.concatenate([array, np.zeros((count, self.widths[name]))])
+
+    def foreach_set(self, name, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size != self.arrays[name].size:
+            raise RuntimeError('foreach_set({!r}) got {} values for {}'.format(name, values.size,
+                                                                            self.arrays[name].size))
+        self.arrays[name][:] = values.reshape(self.arrays[name].shape)
+
+    def foreach_get(self, name, out):
+        if len(out) != self.arrays[name].size:
+            raise RuntimeError('foreach_get({!r}) buffer has the wrong size'.format(name))
+        out[:] = self.arrays[name].ravel()
+
+    def values(self, name):
+        return self.arrays[name]
+
+
+class Layer:
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+
+class LayerCollection(dict):
+    def __init__(self, mesh, widths):
+        super().__init__()
+        self.mesh = mesh
+        self.widths = widths
+
+    def new(self, name=''):
+        name = name or 'Layer{}'.format(len(self))
+        layer = self[name] = Layer(name, PropertyCollection(self.widths, len(self.mesh.loops)))
+        return layer
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self.values())[key]
+        return super().__getitem__(key)
+
+
+class MaterialList(list):
+    def get(self, name):
+        return next((material for material in self if material.name == name), None)
+
+
+class Mesh:
+    def __init__(self, name):
+        self.name = name
+        self.vertices = PropertyCollection({'co': 3})
+        self.loops = PropertyCollection({'vertex_index': 1})
+        self.polygons = PropertyCollection({'loop_start': 1, 'loop_total': 1})
+        self.edges = np.zeros((0, 2), dtype=np.int64)
+        self.uv_layers = LayerCollection(self, {'uv': 2})
+        self.uv_textures = self.uv_layers
+        self.vertex_colors = LayerCollection(self, {'color': 3})  # 2.7x layers are RGB
+        self.materials = MaterialList()
+        self.shape_keys = None
+        self.use_auto_smooth = False
+
+    def update(self, calc_edges=False):
+        if calc_edges:
+            corners = self.loops.values('vertex_index').astype(np.int64).ravel()
+            starts = self.polygons.values('loop_start').astype(np.int64).ravel()
+            totals = self.polygons.values('loop_total').astype(np.int64).ravel()
+            edges = []
+            for start, total in zip(starts, totals):
+                polygon = corners[start:start + total]
+                edges.extend(zip(polygon, np.roll(polygon, -1)))
+            edges = np.sort(np.array(edges, dtype=np.int64).reshape((-1, 2)), axis=1)
+            self.edges = np.unique(edges, axis=0)
+
+
+class VertexGroup:
+    def __init__(self, name):
+        self.name = name
+        self.weights = {}
+        self.add_calls = 0
+
+    def add(self, index, weight, mode):
+        assert mode == 'REPLACE'
+        self.add_calls += 1
+        for vertex in index:
+            self.weights[int(vertex)] = weight
+
+
+class VertexGroups(dict):
+    def new(self, name):
+        group = self[name] = VertexGroup(name)
+        return group
+
+
+class Object:
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.parent = None
+        self.select = False
+        self.vertex_groups = VertexGroups()
+        self.modifiers = types.SimpleNamespace(new=lambda type, name: types.SimpleNamespace(type=type, name=name))
+
+    def shape_key_add(self, name=''):
+        if self.data.shape_keys is None:
+            self.data.shape_keys = types.SimpleNamespace(key_blocks=LayerCollection(self.data, {}))
+        data = PropertyCollection({'co': 3}, len(self.data.vertices))
+        data.arrays['co'][:] = self.data.vertices.values('co')
+        block = self.data.shape_keys.key_blocks[name] = Layer(name, data)
+        return block
+
+
+class Material:
+    def __init__(self, name):
+        self.name = name
+        self.diffuse_color = (1, 1, 1)
+
+
+class Materials(list):
+    def new(self, name):
+        material = Material(name)
+        self.append(material)
+        return material
+
+
+def _operators(*names):
+    return types.SimpleNamespace(**{name: (lambda *args, **kwargs: {'FINISHED'}) for name in names})
+
+
+def make_bpy():
+    """A fresh bpy stub module with an empty scene."""
+    bpy = types.ModuleType('bpy')
+    objects = []
+    bpy.data = types.SimpleNamespace(objects=types.SimpleNamespace(new=Object), meshes=types.SimpleNamespace(new=Mesh),
+                                     materials=Materials())
+    bpy.context = types.SimpleNamespace(scene=types.SimpleNamespace(objects=types.SimpleNamespace(
+        link=objects.append, linked=objects, active=None)))
+    bpy.ops = types.SimpleNamespace(object=_operators('select_all', 'shade_smooth', 'mode_set'))
+    return bpy
+
+
+def make_mathutils():
+    return types.ModuleType('mathutils')
@@ -0,0 +1,88 @@
+"""asyncio loading front end."""
+import asyncio
+import importlib
+import threading
+
+import pytest
+
+
+class SlowSource:
+    """Stands in for a HeroFileCache whose get() blocks until released."""
+
+    def __init__(self, fast=()):
+        self.fast = set(fast)
+        self.release = threading.Event()
+        self.started = []
+
+    def get(self, path, **hero_kwargs):
+        self.started.append(path)
+        if path not in self.fast:
+            self.release.wait(5)
+        return path
+
+
+@pytest.fixture
+def aio(package):
+    return importlib.import_module('HeroForge_parser.aio')
+
+
+def test_load(package, aio, tmp_path):
+    path = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(path, vertex_count=30)
+
+    async def run():
+        loader = aio.HeroLoader(2)
+        try:
+            return await loader.load(path), await loader.load_many([path, path])
+        finally:
+            loader.close()
+
+    hero, heroes = asyncio.run(run())
+    assert hero.vertex_count == 30
+    assert [other.vertex_count for other in heroes] == [30, 30]
+
+
+def test_timeout(aio):
+    source = SlowSource()
+    loader = aio.HeroLoader(1, cache=source)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await loader.load('slow', timeout=0.05)
+        # the slot stays taken until the started load really ends
+        with pytest.raises(asyncio.TimeoutError):
+            await loader.load('queued', timeout=0.05)
+        source.release.set()
+        source.fast.add('next')
+        return await loader.load('next', timeout=5)
+
+    try:
+        assert asyncio.run(run()) == 'next'
+    finally:
+        source.release.set()
+        loader.close()
+    assert source.started == ['slow', 'next']
+
+
+def test_iter_loaded_cancels_pending(aio):
+    source = SlowSource(fast=['path0'])
+    loader = aio.HeroLoader(1, cache=source)
+    paths = ['path{}'.format(n) for n in range(20)]
+
+    async def run():
+        results = loader.iter_loaded(paths)
+        async for path, result in results:
+            assert result == path == 'path0'
+            break
+        await results.aclose()
+        source.release.set()
+        await asyncio.sleep(0.1)
+
+    try:
+        asyncio.run(run())
+    finally:
+        source.release.set()
+        loader.close()
+    # at most the load that took the freed slot ran, the other queued loads were cancelled
+    assert source.started[0] == 'path0'
+    assert len(source.started) <= 2
@@ -0,0 +1,62 @@
+"""Pose clip sampling."""
+import importlib
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def animation(package):
+    return importlib.import_module('HeroForge_parser.animation')
+
+
+@pytest.fixture
+def geometry(package, tmp_path):
+    path = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(path, vertex_count=20, bones=12, frames=5)
+    hero = package.HeroForge.HeroFile(path)
+    hero.read()
+    return hero.geometry
+
+
+def test_key_times(animation, geometry):
+    tracks = geometry.poses['pose0']
+    sampler = animation.ClipSampler(tracks, geometry.bones)
+    assert sampler.key_times.tolist() == [0, 1, 2, 3, 4]
+    sampled = sampler.sample(sampler.key_times)
+    constant = set()
+    for bone_id, bone_name in enumerate(sampler.bone_names):
+        for name, width in animation.CHANNELS:
+            values = np.asarray(tracks[bone_name][name], dtype=np.float32).reshape((-1, width))
+            if len(values) == 1:
+                constant.add(name)
+                values = np.repeat(values, 5, axis=0)  # constant channels broadcast over every key
+            if name == 'rot':
+                # q and -q are the same rotation, interpolation may return either
+                dots = np.sum(sampled[name][:, bone_id] * animation.normalize(values), axis=1)
+                assert np.allclose(np.abs(dots), 1, atol=1e-5), bone_name
+            else:
+                assert np.allclose(sampled[name][:, bone_id], values, atol=1e-5), (bone_name, name)
+    assert constant == {'pos', 'rot', 'scl'}
+
+
+def test_interpolation(animation):
+    tracks = {'root': {'pos': [[0, 0, 0], [2, 4, 6]], 'rot': [[0, 0, 0, 1]], 'scl': [[1, 1, 1]],
+                       'frameMapping': None}}
+    sampler = animation.ClipSampler(tracks)
+    sampled = sampler.sample([0.5, 3])
+    assert np.allclose(sampled['pos'][:, 0], [[1, 2, 3], [2, 4, 6]])
+    assert np.allclose(sampled['rot'][:, 0], [0, 0, 0, 1])
+    assert np.allclose(sampled['scl'][:, 0], 1)
+
+
+def test_loop(animation, geometry):
+    sampler = animation.ClipSampler(geometry.poses['pose0'], geometry.bones)
+    assert sampler.duration == 4
+    times = np.array([0.25, 1.5, 3.75])
+    looped = sampler.sample(times + 2 * sampler.duration, loop=True)
+    clamped = sampler.sample(times + 2 * sampler.duration)
+    plain = sampler.sample(times)
+    for name, _ in animation.CHANNELS:
+        assert np.allclose(looped[name], plain[name], atol=1e-5)
+        assert np.allclose(clamped[name], sampler.sample([4])[name])
@@ -0,0 +1,43 @@
+"""Regression gate of the benchmark module."""
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def benchmark(package):
+    return importlib.import_module('HeroForge_parser.benchmark')
+
+
+def stage(seconds, noise=0.0, peak_bytes=1000):
+    return {'seconds': seconds, 'noise_seconds': noise, 'peak_bytes': peak_bytes}
+
+
+def test_short_stage_jitter(benchmark):
+    baseline = {'part': {'poses': stage(1.2e-3)}}
+    assert benchmark.check_regressions({'part': {'poses': stage(1.9e-3)}}, baseline) == []
+
+
+def test_noisy_stage(benchmark):
+    baseline = {'body': {'uvs': stage(0.020, noise=2e-3)}}
+    assert benchmark.check_regressions({'body': {'uvs': stage(0.030, noise=2e-3)}}, baseline) == []
+    assert benchmark.check_regressions({'body': {'uvs': stage(0.040, noise=2e-3)}}, baseline)
+
+
+def test_regressions(benchmark):
+    baseline = {'body': {'uvs': stage(0.020), 'points': stage(0.020)}}
+    results = {'body': {'uvs': stage(0.030), 'points': stage(0.020, peak_bytes=2000)}}
+    messages = benchmark.check_regressions(results, baseline)
+    assert len(messages) == 2
+    assert messages[0].startswith('body uvs seconds')
+    assert messages[1].startswith('body points peak_bytes')
+
+
+def test_benchmark_file(benchmark, package, tmp_path):
+    path = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(path, vertex_count=100)
+    results = benchmark.benchmark_file(path, repeat=3)
+    assert set(results) == {'header', 'total'} | set(package.HeroForge.HeroFile.STAGES)
+    assert results['total']['bytes'] == (tmp_path / 'part.ckb').stat().st_size
+    assert all(entry['noise_seconds'] >= 0 for entry in results.values())
+    assert benchmark.check_regressions({'part': results}, {'part': results}) == []
@@ -0,0 +1,85 @@
+"""build_meshes and add_flexes against the stub bpy in stub_bpy.py."""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def hero(package, tmp_path):
+    path = tmp_path / 'part.ckb'
+    package.synthetic.write_ckb(str(path), vertex_count=40, shape_keys=3, bones=6, frames=4, weights_per_vertex=6)
+    return package.HeroForge.HeroFile(str(path))
+
+
+def build(bl_loader, hero):
+    if not hero.version:
+        hero.read()
+    importer = bl_loader.HeroIO.__new__(bl_loader.HeroIO)
+    importer.path = None
+    importer.name = 'part'
+    importer.hero = hero
+    importer.armature = importer.armature_obj = None
+    importer.build_meshes()
+    return importer
+
+
+def test_mesh_topology(bl_loader, hero):
+    importer = build(bl_loader, hero)
+    mesh = importer.mesh_data
+    index = np.asarray(importer.geometry.index, dtype=np.int64)
+    assert np.allclose(mesh.vertices.values('co'), importer.geometry.positions)
+    assert np.array_equal(mesh.loops.values('vertex_index').ravel(), index.ravel())
+    assert len(mesh.polygons) == len(index)
+
+    edges = np.sort(np.concatenate([index[:, [0, 1]], index[:, [1, 2]], index[:, [2, 0]]]), axis=1)
+    assert len(mesh.edges)
+    assert np.array_equal(mesh.edges, np.unique(edges, axis=0))
+
+
+def test_loop_attributes(bl_loader, hero):
+    importer = build(bl_loader, hero)
+    mesh = importer.mesh_data
+    geometry = importer.geometry
+    loop_vertices = np.asarray(geometry.index, dtype=np.int64).ravel()
+    assert np.allclose(mesh.uv_layers[0].data.values('uv'), geometry.uv[loop_vertices])
+    for name, colors in geometry.vertex_colors.items():
+        assert np.allclose(mesh.vertex_colors[name].data.values('color'), colors[loop_vertices, :3])
+
+
+def test_vertex_groups(bl_loader, hero):
+    importer = build(bl_loader, hero)
+    geometry = importer.geometry
+    expected = {}
+    for vertex, (bones, weights) in enumerate(zip(geometry.skin_indices, geometry.skin_weights)):
+        for bone, weight in zip(bones, weights):
+            if weight != 0:
+                expected[(vertex, str(bone))] = weight
+    groups = importer.mesh_obj.vertex_groups
+    got = {(vertex, name): weight for name, group in groups.items() for vertex, weight in group.weights.items()}
+    assert got.keys() == expected.keys()
+    assert np.allclose([got[key] for key in expected], list(expected.values()))
+
+
+@pytest.mark.parametrize('weights_per_vertex, zero_weights', [(0, False), (4, True)])
+def test_no_weights(package, bl_loader, tmp_path, weights_per_vertex, zero_weights):
+    path = tmp_path / 'unweighted.ckb'
+    package.synthetic.write_ckb(str(path), vertex_count=10, bones=2, weights_per_vertex=weights_per_vertex)
+    hero = package.HeroForge.HeroFile(str(path))
+    hero.read()
+    if zero_weights:
+        hero.geometry.skin_weights = np.zeros_like(hero.geometry.skin_weights)
+    importer = build(bl_loader, hero)
+    assert all(not group.weights for group in importer.mesh_obj.vertex_groups.values())
+
+
+def test_shape_keys(bl_loader, hero):
+    hero.read()
+    geometry = hero.geometry
+    geometry.shape_key_data.add_decoded('still', np.zeros((len(geometry.positions), 3), dtype=np.float32))
+    importer = build(bl_loader, hero)
+    geometry = importer.geometry
+    key_blocks = importer.mesh_data.shape_keys.key_blocks
+    assert 'still' not in key_blocks
+    assert np.allclose(key_blocks['base'].data.values('co'), geometry.positions)
+    for name in ('key0', 'key1', 'key2'):
+        target = bl_loader.ShapeKeyMixer(geometry.positions, geometry.shape_key_data).target(name)
+        assert np.allclose(key_blocks[name].data.values('co'), geometry.positions + target, atol=1e-6)
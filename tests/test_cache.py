@@ -0,0 +1,86 @@
+"""HeroFileCache and aio.HeroLoader sharing lazy HeroFiles across threads."""
+import asyncio
+import importlib
+import threading
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def eager(package, part_path):
+    hero = package.HeroForge.HeroFile(part_path)
+    hero.read()
+    return hero
+
+
+NAMES = ('positions', 'normals', 'uv', 'skin_weights', 'index', 'positions', 'skin_indices', 'uv2')
+
+
+def check(hero, eager, name):
+    assert np.array_equal(getattr(hero.geometry, name), getattr(eager.geometry, name))
+
+
+@pytest.mark.parametrize('hero_kwargs', [{'lazy': True}, {'lazy': True, 'mmap': True}])
+def test_shared_lazy_hero(package, part_path, eager, hero_kwargs):
+    cache_module = importlib.import_module('HeroForge_parser.cache')
+    for _ in range(20):
+        cache = cache_module.HeroFileCache()
+        barrier = threading.Barrier(len(NAMES))
+        heroes, errors = [], []
+
+        def read(name):
+            try:
+                hero = cache.get(part_path, **hero_kwargs)
+                heroes.append(hero)
+                barrier.wait()
+                check(hero, eager, name)
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=read, args=(name,)) for name in NAMES]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert all(hero is heroes[0] for hero in heroes)
+        assert cache.stats()['misses'] == 1
+
+
+def test_loader_with_lazy_cache(package, part_path, eager):
+    cache_module = importlib.import_module('HeroForge_parser.cache')
+    aio = importlib.import_module('HeroForge_parser.aio')
+
+    async def run(loader):
+        heroes = await loader.load_many([part_path] * len(NAMES))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(loader.executor, check, hero, eager, name)
+                               for hero, name in zip(heroes, NAMES)))
+        return heroes
+
+    loader = aio.HeroLoader(4, cache=cache_module.HeroFileCache(), lazy=True)
+    try:
+        heroes = asyncio.run(run(loader))
+    finally:
+        loader.close()
+    assert all(hero is heroes[0] for hero in heroes)
+
+
+def test_lazy_entry_accounting(package, part_path):
+    cache_module = importlib.import_module('HeroForge_parser.cache')
+    eager = cache_module.HeroFileCache()
+    eager.get(part_path, mmap=True)
+    cache = cache_module.HeroFileCache()
+    hero = cache.get(part_path, lazy=True, mmap=True)
+    inserted = cache.nbytes
+    for name in NAMES + ('bones', 'poses', 'vertex_colors', 'original_indices'):
+        getattr(hero.geometry, name)
+    assert inserted < cache.nbytes == eager.nbytes
+
+    cache = cache_module.HeroFileCache(max_bytes=inserted + 1)
+    hero = cache.get(part_path, lazy=True, mmap=True)
+    assert len(cache) == 1
+    hero.geometry.positions
+    assert len(cache) == 0 and cache.nbytes == 0
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,36 @@
+"""Metadata catalog of .ckb files."""
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def catalog(package):
+    return importlib.import_module('HeroForge_parser.catalog')
+
+
+def test_describe_file(package, catalog, tmp_path):
+    path = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(path, vertex_count=50, shape_keys=2, bones=3, poses=1, locators=1)
+    entry = catalog.describe_file(path)
+    assert 'error' not in entry
+    assert entry['vertex_count'] == 50
+    assert ('bone', 'bone2') in entry['names']
+    assert ('pose', 'pose0') in entry['names']
+    assert ('shape_key', 'key1') in entry['names']
+
+
+def test_broken_poses(package, catalog, tmp_path, monkeypatch):
+    path = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(path, vertex_count=50, bones=3)
+
+    def broken(hero):
+        raise ValueError('bad pose data')
+
+    monkeypatch.setattr(package.HeroForge.HeroFile, '_init_poses', broken)
+    entry = catalog.describe_file(path)
+    assert entry['error'] == "poses: ValueError('bad pose data')"
+
+    with catalog.Catalog(str(tmp_path / 'catalog.sqlite')) as db:
+        db._store([(entry, (0, 0))])
+        assert db.find() == []
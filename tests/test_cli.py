@@ -0,0 +1,19 @@
+"""Batch conversion with the cli module."""
+import importlib
+
+import numpy as np
+
+
+def test_duplicate_stems(package, tmp_path):
+    cli = importlib.import_module('HeroForge_parser.cli')
+    for folder in ('a', 'b'):
+        (tmp_path / folder).mkdir()
+        package.synthetic.write_ckb(str(tmp_path / folder / 'part.ckb'), vertex_count=50, seed=len(folder))
+    report = tmp_path / 'failed.jsonl'
+    status = cli.main([str(tmp_path / 'a'), str(tmp_path / 'b'), '-o', str(tmp_path / 'out'), '-j', '1',
+                       '--report', str(report)])
+    assert status == 1
+    assert sorted(path.name for path in (tmp_path / 'out').iterdir()) == ['part.npz']
+    assert 'already written by' in report.read_text()
+    with np.load(str(tmp_path / 'out' / 'part.npz')) as arrays:
+        assert len(arrays['positions']) == 50
@@ -0,0 +1,83 @@
+"""On-disk GeometryCache and its array file format."""
+import importlib
+import os
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def cache_module(package):
+    return importlib.import_module('HeroForge_parser.cache')
+
+
+def write(package, tmp_path, name, **kwargs):
+    path = str(tmp_path / (name + '.ckb'))
+    package.synthetic.write_ckb(path, seed=len(name), **kwargs)
+    return path
+
+
+def assert_same_arrays(actual, expected):
+    assert sorted(actual) == sorted(expected)
+    for key, values in expected.items():
+        assert np.array_equal(actual[key], values), key
+
+
+def test_round_trip(package, cache_module, tmp_path):
+    path = write(package, tmp_path, 'part', vertex_count=80, shape_keys=3, bones=5, frames=4, poses=2, locators=2)
+    hero = package.HeroForge.HeroFile(path)
+    hero.read()
+    arrays = hero.geometry.to_arrays()
+    assert any(key.endswith('/frame_mapping') for key in arrays)
+    assert any(key.startswith('locators/') for key in arrays)
+
+    entry = str(tmp_path / 'part.hfc')
+    cache_module.write_arrays(entry, arrays)
+    loaded = cache_module.read_arrays(entry)
+    assert_same_arrays(loaded, arrays)
+
+    geometry = package.HeroForge.HeroGeomerty.from_arrays(loaded)
+    assert_same_arrays(geometry.to_arrays(), arrays)
+    assert list(geometry.shape_key_data) == ['key0', 'key1', 'key2']
+    assert list(geometry.bones.names) == list(hero.geometry.bones.names)
+    for clip_name, tracks in hero.geometry.poses.items():
+        for bone_name, track in tracks.items():
+            assert geometry.poses[clip_name][bone_name]['frameMapping'] == track['frameMapping']
+    assert sorted(geometry.locations) == sorted(hero.geometry.locations)
+
+
+def test_hits_and_misses(package, cache_module, tmp_path):
+    path = write(package, tmp_path, 'part', vertex_count=50)
+    cache = cache_module.GeometryCache(tmp_path / 'cache')
+    first = cache.load(path)
+    second = cache.load(path)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(first.positions, second.positions)
+
+
+def test_eviction(package, cache_module, tmp_path):
+    paths = [write(package, tmp_path, name, vertex_count=200) for name in ('a', 'bb', 'ccc')]
+    cache = cache_module.GeometryCache(tmp_path / 'cache')
+    for n, path in enumerate(paths):
+        cache.load(path)
+        entry = cache.entry_path(cache.key(path))
+        os.utime(entry, (n, n))  # make the load order visible to mtime based eviction
+    sizes = [size for _, size, _ in cache.entries()]
+    cache.max_bytes = sum(sizes[1:])
+    cache.evict()
+    assert [entry.stem for _, _, entry in cache.entries()] == [cache.key(path) for path in paths[1:]]
+
+
+def test_truncated_entry(package, cache_module, tmp_path):
+    path = write(package, tmp_path, 'part', vertex_count=200)
+    cache = cache_module.GeometryCache(tmp_path / 'cache')
+    cache.load(path)
+    entry = cache.entry_path(cache.key(path))
+    for size in (entry.stat().st_size // 2, 10):
+        with open(str(entry), 'r+b') as file:
+            file.truncate(size)
+        assert cache.get(cache.key(path)) is None
+        assert not entry.exists()
+        cache.load(path)
+        assert entry.exists()
+    assert cache.misses == 3
@@ -0,0 +1,71 @@
+"""Binary glTF export."""
+import importlib
+import json
+import struct
+
+import numpy as np
+import pytest
+
+COMPONENT_SIZES = {5120: 1, 5121: 1, 5122: 2, 5123: 2, 5125: 4, 5126: 4}
+WIDTHS = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4, 'MAT4': 16}
+
+
+def read_glb(path):
+    data = path.read_bytes()
+    magic, version, total = struct.unpack_from('<4sII', data)
+    assert (magic, version, total) == (b'glTF', 2, len(data))
+    json_length, json_type = struct.unpack_from('<I4s', data, 12)
+    assert json_type == b'JSON' and json_length % 4 == 0
+    gltf = json.loads(data[20:20 + json_length])
+    bin_length, bin_type = struct.unpack_from('<I4s', data, 20 + json_length)
+    assert bin_type == b'BIN\x00'
+    assert 28 + json_length + bin_length == len(data)
+    assert gltf['buffers'][0]['byteLength'] == bin_length
+    return gltf, data[28 + json_length:]
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_export_glb(package, tmp_path, streaming):
+    gltf_module = importlib.import_module('HeroForge_parser.gltf')
+    source = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(source, vertex_count=200, shape_keys=3, bones=8, frames=6, poses=2,
+                                weights_per_vertex=6)
+    hero = package.HeroForge.HeroFile(source)
+    hero.read()
+    path = tmp_path / 'part.glb'
+    size = gltf_module.export_glb(hero, str(path), streaming=streaming)
+    assert size == path.stat().st_size
+    gltf, binary = read_glb(path)
+
+    for accessor in gltf['accessors']:
+        view = gltf['bufferViews'][accessor['bufferView']]
+        assert accessor['count'] * COMPONENT_SIZES[accessor['componentType']] * WIDTHS[accessor['type']] == \
+            view['byteLength']
+        assert view['byteOffset'] % 4 == 0
+        assert view['byteOffset'] + view['byteLength'] <= len(binary)
+
+    primitive = gltf['meshes'][0]['primitives'][0]
+    assert gltf['accessors'][primitive['attributes']['POSITION']]['count'] == 200
+    assert len(primitive['targets']) == 3
+    assert {'JOINTS_1', 'WEIGHTS_1'} <= set(primitive['attributes'])
+    view = gltf['bufferViews'][gltf['accessors'][primitive['attributes']['POSITION']]['bufferView']]
+    positions = np.frombuffer(binary, np.float32, 600, view['byteOffset']).reshape((-1, 3))
+    assert np.allclose(positions, hero.geometry.positions)
+
+    assert [animation['name'] for animation in gltf['animations']] == ['pose0', 'pose1']
+    for animation in gltf['animations']:
+        for sampler in animation['samplers']:
+            output = gltf['accessors'][sampler['output']]
+            assert output['count'] == gltf['accessors'][sampler['input']]['count']
+    assert len(gltf['skins'][0]['joints']) == 8
+
+
+def test_streaming_matches(package, tmp_path):
+    gltf_module = importlib.import_module('HeroForge_parser.gltf')
+    source = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(source, vertex_count=100, shape_keys=2, bones=4, frames=3)
+    hero = package.HeroForge.HeroFile(source)
+    hero.read()
+    gltf_module.export_glb(hero, str(tmp_path / 'a.glb'))
+    gltf_module.export_glb(hero, str(tmp_path / 'b.glb'), streaming=True)
+    assert (tmp_path / 'a.glb').read_bytes() == (tmp_path / 'b.glb').read_bytes()
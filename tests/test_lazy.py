@@ -0,0 +1,54 @@
+"""Lazy HeroFile decoding."""
+import pickle
+import threading
+
+import numpy as np
+import pytest
+
+
+def test_lazy_matches_eager(package, part_path):
+    eager = package.HeroForge.HeroFile(part_path)
+    eager.read()
+    lazy = package.HeroForge.HeroFile(part_path, lazy=True)
+    lazy.read()
+    for name in ('index', 'positions', 'normals', 'uv', 'skin_indices', 'skin_weights'):
+        assert np.array_equal(getattr(lazy.geometry, name), getattr(eager.geometry, name))
+    assert list(lazy.geometry.poses) == list(eager.geometry.poses)
+
+
+def test_concurrent_first_access(package, part_path):
+    for _ in range(20):
+        hero = package.HeroForge.HeroFile(part_path, lazy=True)
+        hero.read()
+        barrier = threading.Barrier(8)
+        counts = []
+
+        def read(name):
+            barrier.wait()
+            counts.append((name, len(getattr(hero.geometry, name))))
+
+        threads = [threading.Thread(target=read, args=(name,))
+                   for name in ('positions', 'normals', 'uv', 'positions', 'skin_weights', 'bones', 'index',
+                                'positions')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = {'positions': 300, 'normals': 300, 'uv': 300, 'skin_weights': 300, 'bones': 8, 'index': 600}
+        assert sorted(counts) == sorted((name, expected[name]) for name, _ in counts)
+
+
+@pytest.mark.parametrize('hero_kwargs', [{}, {'lazy': True}, {'lazy': True, 'mmap': True}])
+def test_pickle_geometry(package, part_path, hero_kwargs):
+    eager = package.HeroForge.HeroFile(part_path)
+    eager.read()
+    hero = package.HeroForge.HeroFile(part_path, **hero_kwargs)
+    hero.read()
+    geometry = pickle.loads(pickle.dumps(hero.geometry))
+    for name in geometry.ARRAY_ATTRIBUTES:
+        assert np.array_equal(getattr(geometry, name), getattr(eager.geometry, name))
+    assert list(geometry.shape_key_data) == list(eager.geometry.shape_key_data)
+    assert list(geometry.poses) == list(eager.geometry.poses)
+    assert list(geometry.bones.names) == list(eager.geometry.bones.names)
+    welded, _, _ = geometry.weld()
+    assert len(welded.positions) == len(geometry.positions)
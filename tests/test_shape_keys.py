@@ -0,0 +1,35 @@
+"""Batched shape key mixing."""
+import importlib
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def shape_keys(package):
+    return importlib.import_module('HeroForge_parser.shape_keys')
+
+
+def test_no_shape_keys(shape_keys):
+    positions = np.arange(12, dtype=np.float32).reshape((4, 3))
+    mixer = shape_keys.ShapeKeyMixer(positions, {})
+    assert np.array_equal(mixer.evaluate(np.zeros(0)), positions)
+    assert mixer.evaluate(np.zeros((5, 0))).shape == (5, 4, 3)
+    assert np.array_equal(mixer.evaluate(np.zeros((5, 0)))[3], positions)
+    assert mixer.offsets(np.zeros((2, 0))).shape == (2, 0, 3)
+
+
+def test_evaluate_matches_dense_sum(package, shape_keys, tmp_path):
+    path = str(tmp_path / 'face.ckb')
+    package.synthetic.write_ckb(path, vertex_count=120, shape_keys=5)
+    hero = package.HeroForge.HeroFile(path)
+    hero.read()
+    geometry = hero.geometry
+    mixer = shape_keys.ShapeKeyMixer.from_geometry(geometry, tolerance=0)
+    weights = np.random.default_rng(1).uniform(-1, 1, (7, len(mixer.names))).astype(np.float32)
+    targets = np.stack([geometry.shape_key_data[name] for name in mixer.names])
+    expected = geometry.positions[None] + np.einsum('mk,knc->mnc', weights, targets)
+    assert np.allclose(mixer.evaluate(weights), expected, atol=1e-5)
+    assert np.allclose(mixer.evaluate(weights[2]), expected[2], atol=1e-5)
+    single = mixer.weights({mixer.names[1]: 0.5})
+    assert np.allclose(mixer.evaluate(single), geometry.positions + 0.5 * targets[1], atol=1e-6)
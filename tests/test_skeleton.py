@@ -0,0 +1,20 @@
+"""Rest skeleton decoding."""
+import numpy as np
+
+
+def test_empty_rest_tracks(package, tmp_path):
+    path = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(path, vertex_count=20, bones=12, frames=3, rest_frames=0)
+    stats = package.HeroForge.ReadStats()
+    hero = package.HeroForge.HeroFile(path)
+    hero.read(stats)
+    assert stats.errors == {}
+    assert stats.aligned
+    bones = hero.geometry.bones
+    assert len(bones) == 12
+    assert hero.geometry.main_skeleton
+    # constant channels still hold their value, empty animated ones fall back to the identity
+    identity = np.all(bones.quaternions == [0, 0, 0, 1], axis=1)
+    assert identity.any() and not identity.all()
+    assert np.all(np.isfinite(bones.scales))
+    assert list(hero.geometry.poses) == ['pose0']
@@ -0,0 +1,59 @@
+"""Forward kinematics and linear blend skinning."""
+import importlib
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def skinning(package):
+    return importlib.import_module('HeroForge_parser.skinning')
+
+
+@pytest.fixture
+def geometry(package, tmp_path):
+    path = str(tmp_path / 'body.ckb')
+    package.synthetic.write_ckb(path, vertex_count=60, bones=10, frames=3, weights_per_vertex=6)
+    hero = package.HeroForge.HeroFile(path)
+    hero.read()
+    return hero.geometry
+
+
+def test_world_matrices(skinning, geometry):
+    bones = geometry.bones
+    local = skinning.compose_matrices(bones.positions, bones.quaternions, bones.scales)
+
+    def world(bone_id):
+        parent_id = int(bones.parent_ids[bone_id])
+        if 0 <= parent_id < len(bones):
+            return world(parent_id) @ local[bone_id]
+        return local[bone_id]
+
+    expected = np.stack([world(bone_id) for bone_id in range(len(bones))])
+    assert np.array_equal(skinning.world_matrices(bones.parent_ids, local), expected)
+    batch = skinning.world_matrices(bones.parent_ids, np.stack([local, local]))
+    assert np.array_equal(batch[1], expected)
+
+
+def test_rest_pose(skinning, geometry):
+    skinned = skinning.skin_geometry(geometry, None)
+    assert np.allclose(skinned['positions'], geometry.positions, atol=1e-3)
+    normals = geometry.normals / np.linalg.norm(geometry.normals, axis=1, keepdims=True)
+    assert np.allclose(skinned['normals'], normals, atol=1e-3)
+
+
+def test_six_influences(skinning, geometry):
+    indices, weights = skinning.influences(geometry)
+    assert indices.shape == weights.shape == (60, 6)
+    assert np.allclose(weights.sum(axis=1), 1)
+    assert np.array_equal(indices[:, 4:], geometry.additional_skin_indices)
+
+    rng = np.random.default_rng(3)
+    matrices = np.tile(np.eye(4, dtype=np.float32), (len(geometry.bones), 1, 1))
+    matrices[:, :3, :] += rng.normal(0, 0.1, (len(geometry.bones), 3, 4)).astype(np.float32)
+    positions, _ = skinning.linear_blend_skin(geometry.positions, None, indices, weights, matrices)
+    expected = np.zeros_like(positions)
+    for vertex, position in enumerate(geometry.positions):
+        for bone, weight in zip(indices[vertex], weights[vertex]):
+            expected[vertex] += weight * (matrices[bone, :3, :3] @ position + matrices[bone, :3, 3])
+    assert np.allclose(positions, expected, atol=1e-4)
@@ -0,0 +1,45 @@
+"""HeroGeomerty.weld."""
+import numpy as np
+
+
+def make_geometry(package):
+    geometry = package.HeroForge.HeroGeomerty()
+    geometry.positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 0]], dtype=np.float32)
+    geometry.uv = np.array([[0, 0], [1, 0], [0, 1], [0, 0]], dtype=np.float32)
+    geometry.index = np.array([[0, 1, 2], [3, 1, 2], [0, 3, 1]], dtype=np.uint16)
+    geometry.original_indices = np.array([[5, 6, 7], [8, 6, 7], [5, 8, 6]], dtype=np.uint16)
+    geometry.shape_key_data.add_decoded('smile', np.arange(12, dtype=np.float32).reshape((4, 3)) * [0, 0, 0])
+    return geometry
+
+
+def test_weld(package):
+    geometry = make_geometry(package)
+    welded, kept, remap = geometry.weld()
+    assert kept.tolist() == [0, 1, 2]
+    assert remap.tolist() == [0, 1, 2, 0]
+    assert welded.index.tolist() == [[0, 1, 2], [0, 1, 2]]
+    assert welded.original_indices.tolist() == [[5, 6, 7], [8, 6, 7]]
+    assert len(welded.positions) == len(welded.uv) == len(welded.shape_key_data['smile']) == 3
+
+
+def test_weld_keeps_source(package):
+    geometry = make_geometry(package)
+    before = {name: np.copy(getattr(geometry, name)) for name in geometry.ARRAY_ATTRIBUTES}
+    geometry.weld()
+    for name, values in before.items():
+        assert np.array_equal(getattr(geometry, name), values)
+    assert len(geometry.shape_key_data['smile']) == 4
+
+
+def test_weld_lazy(package, tmp_path):
+    path = str(tmp_path / 'part.ckb')
+    package.synthetic.write_ckb(path, vertex_count=60)
+    eager = package.HeroForge.HeroFile(path)
+    eager.read()
+    lazy = package.HeroForge.HeroFile(path, lazy=True)
+    lazy.read()
+    welded, _, _ = lazy.geometry.weld()
+    expected, _, _ = eager.geometry.weld()
+    for name in welded.ARRAY_ATTRIBUTES:
+        assert np.array_equal(getattr(welded, name), getattr(expected, name))
+    assert list(welded.poses) == list(expected.poses)